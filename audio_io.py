@@ -0,0 +1,45 @@
+import os
+import subprocess
+import tempfile
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class AudioDecodeError(ValueError):
+    '''
+    ffmpeg couldn't read the upload, it's empty or not audio
+    '''
+
+
+def ffmpeg_pcm(source, data=None, sr=SAMPLE_RATE):
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", source,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr),
+        "-",
+    ]
+    return subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+
+
+def decode_audio(data, sr=SAMPLE_RATE):
+    '''
+    decodes uploaded audio bytes to the mono float32 array whisper expects, through
+    an ffmpeg pipe so nothing touches the disk. containers that can't be read from a
+    pipe (e.g. mp4 with the index at the end) fall back to a per-request temp file.
+    raises AudioDecodeError when neither can read it
+    '''
+    try:
+        pcm = ffmpeg_pcm("pipe:0", data, sr)
+    except subprocess.CalledProcessError:
+        fd, path = tempfile.mkstemp(prefix="upload_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            pcm = ffmpeg_pcm(path, None, sr)
+        except subprocess.CalledProcessError as e:
+            reason = e.stderr.decode(errors="replace").strip().splitlines()[-1:] if e.stderr else []
+            raise AudioDecodeError(f"Could not decode the audio: {reason[0] if reason else 'ffmpeg failed'}") from e
+        finally:
+            os.remove(path)
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
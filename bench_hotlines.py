@@ -0,0 +1,52 @@
+import json
+import time
+from hotlines import HotlineIndex
+
+# python bench_hotlines.py
+# size of the emergency system prompt with the whole directory vs only the
+# categories the classifier picks, and how long picking them takes
+
+TEXTS = [
+    "I'm feeling really down and and I just cut myself out of hate. I need help.",
+    "I don't want to live anymore, I keep thinking about ending it all.",
+    "I've been binge eating and then throwing up after every meal.",
+    "My boyfriend hit me again last night and I'm scared to go home.",
+    "My dad passed away last month and I can't stop crying.",
+    "I relapsed and started drinking again after two years sober.",
+    "I had a stressful day at work and feel a bit overwhelmed.",
+    "I'm 15 and I want to run away from home.",
+]
+REPEATS = 2000
+
+
+def prompt(numbers):
+    return f'''You are an AI assistant who returns a brief consoling message to help the user and, only if needed provides a relevant phone number with the name of a hotline. 
+    The only numbers you can use are these: {json.dumps(numbers)}'''
+
+
+def tokens(text):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return len(tiktoken.encoding_for_model("gpt-4o-mini").encode(text))
+
+
+def main():
+    index = HotlineIndex()
+    start = time.perf_counter()
+    full = prompt(index.directory)
+    full_build = (time.perf_counter() - start) * 1e6
+    print(f"full directory: {len(full)} chars, {tokens(full)} tokens, {full_build:.0f} us to build")
+
+    for text in TEXTS:
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            filtered = prompt(index.relevant(text))
+        elapsed = (time.perf_counter() - start) / REPEATS * 1e6
+        print(f"{len(filtered):5} chars {tokens(filtered)!s:>5} tokens {elapsed:6.0f} us  "
+              f"{index.classify(text)[1:]}  {text[:50]!r}")
+
+
+if __name__ == "__main__":
+    main()
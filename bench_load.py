@@ -0,0 +1,225 @@
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from data_gen import generate_synthetic_data
+
+# python bench_load.py [--base-url http://localhost:8000] [--users 200] [--items 100] [--no-seed]
+#                      [--concurrency 16] [--duration 30] [--mix timeline=40,goals=20,prescription=20,notes=15,recommend=5]
+#                      [--baseline bench_baseline.json] [--save-baseline] [--tolerance 0.2]
+#
+# seeds users with data_gen.generate_synthetic_data straight into mongo,
+# then drives the API with `concurrency` clients picking endpoints by the weights in
+# --mix. reports throughput and p50/p95/p99 latency per endpoint. --save-baseline
+# writes the numbers to --baseline, later runs compare against it and exit 1 when
+# an endpoint's p95 or throughput got worse than --tolerance allows.
+#
+# /notes and /recommend call the model providers, run against fake_providers.py
+# for numbers that don't depend on (or cost) the real APIs
+
+MIX = "timeline=40,goals=20,prescription=20,notes=15,recommend=5"
+# bench users get their own id range so the demo users from data_gen stay untouched
+FIRST_USER = 100000
+QUERIES = [
+    "I feel anxious all the time",
+    "I can't sleep since I lost my job",
+    "How do I talk to my parents about my eating disorder?",
+    "I've been feeling lonely after moving",
+    "My medication makes me tired, is that normal?",
+]
+NOTES = [
+    "Went for a walk today and felt a bit better afterwards.",
+    "Hard day at work, I kept worrying about the presentation.",
+    "Took my medication on time all week.",
+    "Talked to my sister on the phone, it helped.",
+]
+
+
+def endpoints(base_url):
+    def timeline(session, rng, uid):
+        return session.get(f"{base_url}/api/timeline/{uid}", params={"limit": 50})
+
+    def goals(session, rng, uid):
+        return session.get(f"{base_url}/api/goals/{uid}")
+
+    def prescription(session, rng, uid):
+        return session.get(f"{base_url}/api/prescription/{uid}")
+
+    def notes(session, rng, uid):
+        return session.post(f"{base_url}/api/notes", json={"user_id": uid, "content": rng.choice(NOTES)})
+
+    def recommend(session, rng, uid):
+        # a handful of sessions per user so the history windows stay realistic
+        return session.post(f"{base_url}/recommend", json={"query": rng.choice(QUERIES), "session_id": f"bench-{uid}-{rng.randint(0, 4)}"})
+
+    return {"timeline": timeline, "goals": goals, "prescription": prescription, "notes": notes, "recommend": recommend}
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def add(self, name, seconds, status):
+        with self.lock:
+            if status is not None and 200 <= status < 300:
+                self.latencies.setdefault(name, []).append(seconds)
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            key = f"{name} {status}"
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def summary(self, elapsed):
+        results = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(name, [])
+            results[name] = {
+                "requests": len(values) + self.errors.get(name, 0),
+                "errors": self.errors.get(name, 0),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 1) if values else None,
+                "p95_ms": round(percentile(values, 95) * 1000, 1) if values else None,
+                "p99_ms": round(percentile(values, 99) * 1000, 1) if values else None,
+                "max_ms": round(max(values) * 1000, 1) if values else None,
+            }
+        return results
+
+
+def run(base_url, user_ids, mix, concurrency, duration, warmup, seed_value):
+    calls = endpoints(base_url)
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+    recorder = Recorder()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop = measure_from + duration
+
+    def worker(n):
+        rng = random.Random(f"{seed_value}:{n}")
+        session = requests.Session()
+        while True:
+            now = time.perf_counter()
+            if now >= stop:
+                return
+            name = rng.choices(names, weights)[0]
+            try:
+                response = calls[name](session, rng, rng.choice(user_ids))
+                status = response.status_code
+            except requests.RequestException:
+                status = None
+            if now >= measure_from:
+                recorder.add(name, time.perf_counter() - now, status)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return recorder
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before or before.get("p95_ms") is None or current.get("p95_ms") is None:
+            continue
+        if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+        if current["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="load test for the flask API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--items", type=int, default=100, help="median timeline entries per user")
+    parser.add_argument("--no-seed", action="store_true", help="reuse the bench users of a previous run")
+    parser.add_argument("--random-seed", default="42")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--mix", default=MIX)
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    mix = {name: float(weight) for name, weight in (item.split("=") for item in args.mix.split(","))}
+    unknown = set(mix) - set(endpoints(args.base_url))
+    if unknown:
+        parser.error(f"unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+
+    user_ids = list(range(FIRST_USER, FIRST_USER + args.users))
+    if not args.no_seed:
+        generate_synthetic_data(
+            users=args.users,
+            median_items=args.items,
+            seed=args.random_seed,
+            first_user_id=FIRST_USER,
+            mongo_uri=args.mongo_uri,
+        )
+
+    recorder = run(args.base_url, user_ids, mix, args.concurrency, args.duration, args.warmup, args.random_seed)
+    results = recorder.summary(args.duration)
+
+    total = sum(r["requests"] - r["errors"] for r in results.values())
+    print(f"\n{args.concurrency} clients, {args.duration:.0f}s, {total / args.duration:.1f} req/s overall")
+    print(f"{'endpoint':<14}{'reqs':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, r in results.items():
+        cells = [r[k] if r[k] is not None else "-" for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+        print(f"{name:<14}{r['requests']:>7}{r['errors']:>8}{r['throughput_rps']:>9}" + "".join(f"{c:>9}" for c in cells))
+    if any(r["errors"] for r in results.values()):
+        print("Status codes:", recorder.statuses)
+
+    report = {
+        "revision": git_revision(),
+        "created_at": datetime.utcnow().isoformat(),
+        "config": {k: getattr(args, k) for k in ("users", "items", "concurrency", "duration", "mix", "random_seed")},
+        "results": results,
+    }
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+    if baseline.get("config") != report["config"]:
+        print("Warning: the baseline was recorded with a different configuration:", baseline.get("config"))
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print("REGRESSION", line)
+    if not regressions:
+        print(f"No regressions against {args.baseline} (revision {baseline.get('revision')})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
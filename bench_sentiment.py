@@ -0,0 +1,49 @@
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+import sentiment
+from sentiment import sentiment_analysis, get_sentiments, _classify
+
+# python bench_sentiment.py
+# compares the old one-text-per-call path with batched and micro-batched calls
+
+SENTENCES = [
+    "I went for a walk today and it felt great.",
+    "I couldn't sleep again last night and I'm exhausted.",
+    "Took my medication on time, feeling calmer.",
+    "Everything feels pointless lately.",
+    "Had a really good session with my therapist.",
+    "I'm anxious about work tomorrow.",
+]
+
+
+def corpus(n, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(SENTENCES) for _ in range(n)]
+
+
+def bench(name, fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {n:>5} texts  {elapsed:7.2f}s  {n / elapsed:8.1f} texts/s")
+
+
+def main(n=256, threads=16):
+    texts = corpus(n)
+    unique = [t + f" ({i})" for i, t in enumerate(texts)]
+    # warm the model so the first timing isn't paying for it
+    sentiment_analysis(texts[:2])
+
+    bench("unbatched (old path)", lambda: [sentiment_analysis(t) for t in unique], n)
+    bench("batched", lambda: _classify(unique), n)
+    bench("batched + dedup", lambda: _classify(texts), n)
+    if sentiment.batcher is not None:
+        batches_before = sentiment.batcher.batches
+        with ThreadPoolExecutor(threads) as pool:
+            bench(f"micro-batched ({threads} threads)", lambda: list(pool.map(lambda t: get_sentiments([t]), unique)), n)
+        print(f"micro-batcher ran {sentiment.batcher.batches - batches_before} forward passes")
+
+
+if __name__ == "__main__":
+    main()
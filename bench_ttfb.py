@@ -0,0 +1,46 @@
+import sys
+import time
+import statistics
+import requests
+
+# python bench_ttfb.py [base_url]
+# client-side time to first byte and total time for /process_text and /recommend,
+# blocking vs ?stream=1 (SSE). the server's own view is at GET /metrics/ttfb
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+REPEATS = 5
+CASES = [
+    ("/process_text", {"text": "I've been feeling really low and I can't sleep."}),
+    ("/recommend", {"query": "I feel anxious all the time", "session_id": "bench-ttfb"}),
+]
+
+
+def measure(path, body, stream):
+    url = BASE_URL + path + ("?stream=1" if stream else "")
+    start = time.perf_counter()
+    with requests.post(url, json=body, stream=True) as response:
+        response.raise_for_status()
+        ttfb = None
+        for chunk in response.iter_content(chunk_size=None):
+            if ttfb is None and chunk:
+                ttfb = time.perf_counter() - start
+        total = time.perf_counter() - start
+    return ttfb, total
+
+
+def main():
+    for path, body in CASES:
+        for stream in (False, True):
+            ttfbs, totals = [], []
+            for _ in range(REPEATS):
+                ttfb, total = measure(path, body, stream)
+                ttfbs.append(ttfb)
+                totals.append(total)
+                requests.post(BASE_URL + "/reset", json={"session_id": "bench-ttfb"})
+            mode = "stream" if stream else "blocking"
+            print(f"{path:<14} {mode:<9} ttfb p50 {statistics.median(ttfbs) * 1000:7.0f} ms   "
+                  f"total p50 {statistics.median(totals) * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+import time
+import statistics
+from dotenv import load_dotenv
+from langchain_pinecone import PineconeVectorStore
+from pinecone import Pinecone
+from embedding_cache import CachedEmbeddings
+import llm_client
+from numpy_vectorstore import NumpyVectorStore
+
+# python bench_vectorstore.py
+# top-3 latency of the in-process numpy index vs the remote pinecone "people" index.
+# run `VECTOR_BACKEND=numpy python load.py` first so people_index.npz exists.
+# both stores get the same precomputed query vectors so only the search is timed
+
+load_dotenv()
+
+QUERIES = [
+    "eating disorder",
+    "I feel anxious all the time",
+    "I can't sleep",
+    "I lost my job and feel worthless",
+    "panic attacks at work",
+    "drinking too much",
+    "grief after losing my mother",
+    "I hear voices",
+]
+REPEATS = 20
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def bench(name, store, vectors):
+    timings = []
+    for _ in range(REPEATS):
+        for vector in vectors:
+            start = time.perf_counter()
+            store.similarity_search_by_vector_with_score(vector, k=3)
+            timings.append((time.perf_counter() - start) * 1000)
+    print(f"{name:<10} p50 {statistics.median(timings):8.3f} ms  p95 {percentile(timings, 0.95):8.3f} ms  "
+          f"p99 {percentile(timings, 0.99):8.3f} ms  ({len(timings)} queries)")
+
+
+def main():
+    embeddings = CachedEmbeddings(llm_client.ProviderEmbeddings("text-embedding-3-small"), "text-embedding-3-small")
+    vectors = [embeddings.embed_query(query) for query in QUERIES]
+
+    numpy_store = NumpyVectorStore.load(embeddings)
+    print(f"numpy index: {len(numpy_store.ids)} vectors, matrix {numpy_store.matrix.shape}")
+    bench("numpy", numpy_store, vectors)
+
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    pinecone_store = PineconeVectorStore(pc.Index("people"), embeddings)
+    bench("pinecone", pinecone_store, vectors)
+
+
+if __name__ == "__main__":
+    main()
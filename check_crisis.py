@@ -0,0 +1,49 @@
+import sys
+from hotlines import HotlineIndex
+from crisis import CrisisDetector
+
+# python check_crisis.py
+# runs the local crisis matcher over messages that must (category) or must not (None)
+# take the fast path, exits 1 on any difference. run it after touching the lexicon
+
+CASES = [
+    ("I want to kill myself", "Suicide"),
+    ("I feel suicidal", "Suicide"),
+    ("No, I want to die", "Suicide"),
+    ("No. I want to kill myself", "Suicide"),
+    ("I'm not ok, I want to die", "Suicide"),
+    ("I'm not ok but I want to end my life", "Suicide"),
+    ("I don't want to live anymore", "Suicide"),
+    ("The pain is too much, I cant go on anymore", "Suicide"),
+    ("I hate myself and want to disappear", "Suicide"),
+    ("Everyone would be better off without me", "Suicide"),
+    ("I keep cutting myself", "Self-Injury"),
+    ("I took too many pills and I want to die", "Serious and Urgent"),
+    ("he hits me every night", "Domestic Violence"),
+    ("I'm not suicidal, just tired", None),
+    ("I will never kill myself", None),
+    ("I would never hurt myself", None),
+    ("I don't want to die", None),
+    ("what is suicide prevention month", None),
+    ("I want to die laughing at this meme", None),
+    ("that cake is to die for", None),
+    ("I can't go on vacation this year", None),
+    ("I had a stressful day at work", None),
+]
+
+
+def main():
+    detector = CrisisDetector(HotlineIndex("scraped_data.json"))
+    failures = 0
+    for text, expected in CASES:
+        hit = detector.check(text)
+        got = hit["category"] if hit else None
+        ok = got == expected
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':<6}{text!r:50} {got}" + ("" if ok else f" (expected {expected})"))
+    print(f"{failures} of {len(CASES)} cases failed" if failures else f"All {len(CASES)} cases pass")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from dotenv import load_dotenv
+import llm_client
+
+# python check_parallel_audio.py [base_url] [n]
+# speaks N different sentences with TTS, posts them to /process_audio at the same
+# time as raw binary bodies and checks every response transcribes its own sentence.
+# before uploads were decoded in memory, parallel requests overwrote temp_audio.wav
+
+load_dotenv()
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+N = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+PHRASES = [
+    "I walked my dog in the park this morning",
+    "My sister is visiting me next weekend",
+    "I forgot to water the tomato plants",
+    "The train to work was cancelled again",
+    "I baked banana bread with my grandmother",
+    "Our basketball team won the final game",
+    "I started reading a novel about pirates",
+    "The printer in the office is broken",
+    "I painted the kitchen a bright yellow",
+    "We adopted a kitten called Pepper",
+]
+
+
+def words(text):
+    return set(re.findall(r"[a-z]+", text.lower()))
+
+
+def overlap(a, b):
+    return len(words(a) & words(b)) / len(words(a))
+
+
+def post(audio):
+    response = requests.post(BASE_URL + "/process_audio", data=audio, headers={"Content-Type": "audio/mpeg"})
+    response.raise_for_status()
+    return response.json()["transcription"]
+
+
+def main():
+    phrases = [PHRASES[i % len(PHRASES)] for i in range(N)]
+    clips = [llm_client.speech("tts-1", "alloy", p) for p in phrases]
+    with ThreadPoolExecutor(N) as pool:
+        transcriptions = list(pool.map(post, clips))
+
+    failures = 0
+    for phrase, transcription in zip(phrases, transcriptions):
+        own = overlap(phrase, transcription)
+        ok = own >= 0.6
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {own:4.0%}  sent: {phrase!r}  got: {transcription.strip()!r}")
+    print(f"{N - failures}/{N} parallel requests got their own transcription")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import sys
+import argparse
+from pymongo import MongoClient, DESCENDING
+from bson import ObjectId
+from data_gen import generate_synthetic_data
+from db_indexes import ensure_indexes
+from enrichment import claimable
+from mongo_functions import timeline_query, encode_timeline_cursor, TIMELINE_COMPACT_PROJECTION, TIMELINE_DEFAULT_LIMIT
+
+# python check_query_plans.py [--mongo-uri mongodb://localhost:27017/] [--db query_plans] [--users 50] [--no-seed]
+#
+# seeds a scratch database with data_gen, runs the index bootstrap from db_indexes
+# and explains every query mongo_functions and flask_server make. exits 1 when a
+# winning plan scans the whole collection (COLLSCAN) or sorts in memory (SORT),
+# i.e. when a query shape changed without an index to go with it.
+# --db main_db --no-seed checks the real database instead
+
+FIRST_USER = 1000
+BAD_STAGES = ("COLLSCAN", "SORT")
+
+
+def find(collection, query, projection=None, sort=None, limit=0):
+    def explain(db):
+        cursor = db[collection].find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        return cursor.limit(limit).explain()
+    return explain
+
+
+def update(collection, query, change):
+    def explain(db):
+        return db.command("explain", {"update": collection, "updates": [{"q": query, "u": change}]}, verbosity="queryPlanner")
+    return explain
+
+
+def timeline(user_id, limit=TIMELINE_DEFAULT_LIMIT, projection=None, **kwargs):
+    query, sort = timeline_query(user_id, **kwargs)
+    # limit=None is get_timeline without limit or cursor, the whole timeline
+    return find("user_data", query, projection, sort, limit + 1 if limit else 0)
+
+
+def queries(db):
+    '''
+    (name, explain) for each query, the values come from whatever is in `db`
+    '''
+    user = db["user_info"].find_one() or {"_id": FIRST_USER, "user_id": FIRST_USER, "username": "nobody"}
+    user_id = user.get("user_id", user["_id"])
+    item = db["user_data"].find_one({"user_id": user_id, "timestamp": {"$ne": None}}) or {"_id": ObjectId(), "timestamp": 0}
+    goal = db["user_data"].find_one({"user_id": user_id, "type": "goal"}) or {"_id": ObjectId()}
+    prescription = db["prescriptions"].find_one({"user_id": user_id}) or {"_id": ObjectId()}
+    cursor = encode_timeline_cursor(item)
+    untimed = encode_timeline_cursor({"timestamp": None, "_id": item["_id"]})
+
+    return [
+        # mongo_functions
+        ("get_timeline", timeline(user_id)),
+        ("get_timeline unpaginated", timeline(user_id, limit=None)),
+        ("get_timeline compact", timeline(user_id, projection=TIMELINE_COMPACT_PROJECTION)),
+        ("get_timeline type", timeline(user_id, item_type="notes")),
+        ("get_timeline before", timeline(user_id, before=cursor)),
+        ("get_timeline after", timeline(user_id, after=cursor)),
+        ("get_timeline type before", timeline(user_id, before=cursor, item_type="notes")),
+        ("get_timeline type after", timeline(user_id, after=cursor, item_type="notes")),
+        ("get_timeline before untimed", timeline(user_id, before=untimed)),
+        ("get_timeline after untimed", timeline(user_id, after=untimed)),
+        ("get_prescriptions", find("prescriptions", {"user_id": user_id}, sort=[("created_at", DESCENDING)])),
+        ("get_goals", find("user_data", {"user_id": user_id, "type": "goal"})),
+        ("update_goal", update("user_data", {"_id": goal["_id"]}, {"$set": {"completed": True}})),
+        ("resume_pending_enrichment", find("user_data", claimable(), {"type": 1, "content": 1})),
+        ("run_enrichment claim", update("user_data", {"_id": item["_id"], **claimable()}, {"$set": {"claimed_at": None}})),
+        # flask_server
+        ("get_user", find("user_info", {"_id": user["_id"]}, limit=1)),
+        ("get_userid", find("user_info", {"username": user.get("username")}, limit=1)),
+        ("update_prescription", update("user_data", {"_id": prescription["_id"]}, {"$set": {"expiry": None}})),
+        ("add_goal_api", find("user_data", {"_id": goal["_id"]}, limit=1)),
+        ("complete_goal_api", find("user_data", {"_id": goal["_id"], "type": "goal"}, limit=1)),
+    ]
+
+
+def plan_stages(explained):
+    '''
+    stage names of the winning plan, outermost first
+    '''
+    stages = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if isinstance(node.get("stage"), str):
+                stages.append(node["stage"])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(explained["queryPlanner"]["winningPlan"])
+    return stages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="fails when a query's plan scans a collection or sorts in memory")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="query_plans")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--no-seed", action="store_true", help="explain against the data already in --db")
+    args = parser.parse_args(argv)
+
+    if not args.no_seed:
+        generate_synthetic_data(users=args.users, median_items=20, first_user_id=FIRST_USER, mongo_uri=args.mongo_uri, db_name=args.db)
+    db = MongoClient(args.mongo_uri)[args.db]
+    ensure_indexes(db)
+
+    checks = queries(db)
+    failures = 0
+    for name, explain in checks:
+        stages = plan_stages(explain(db))
+        bad = [stage for stage in stages if stage in BAD_STAGES]
+        failures += bool(bad)
+        print(f"{'FAIL' if bad else 'ok':<6}{name:<30}{' <- '.join(stages)}")
+    print(f"{failures} of {len(checks)} queries need an index" if failures else "Every query is served by an index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from gemini_beater import flash_structured_inference
+from takeaways import parse_takeaways
+
+
+class Enrichment(BaseModel):
+    summary: str
+    mood: str
+    takeaways: str = ""
+
+
+def get_combined_enrichment(data, sentiment, with_takeaways=False) -> dict:
+    '''
+    summary, mood and (optionally) takeaways in one flash call instead of three,
+    returns the same shapes as get_summary, get_mood and get_takeaways
+    '''
+    takeaways_prompt = """
+    "takeaways": 3 takeaways from this entire conversation. The takeaways should be concise and capture the main points of the text. There should be 3 takeaways. The takeaways should be separated by commas (,) in a single string. Do not do more than 1 sentence per takeaway, do not use periods or any other punctuations.""" if with_takeaways else ""
+    prompt = """
+    Analyse the following text and respond with a JSON object with these keys:
+    "summary": a summary of the text. The summary should be concise and capture the main points of the text. The summary is of the user's conversation with a bot and we want to highlight the summary back to the user.
+    "mood": only one word that describes the mood of the text given the sentiment and the text.{takeaways_prompt}
+
+    sentiment: {sentiment}
+
+    The text is as follows:
+    {data}
+"""
+    result = flash_structured_inference(
+        prompt.format(data=data, sentiment=sentiment, takeaways_prompt=takeaways_prompt),
+        Enrichment,
+    )
+    fields = {
+        "summary": result.summary,
+        "mood": result.mood.replace('\n', '').strip(),
+    }
+    if with_takeaways:
+        fields["takeaways"] = parse_takeaways(result.takeaways)
+    return fields
@@ -0,0 +1,176 @@
+import re
+from collections import deque
+
+# curated risk lexicon: phrase -> (category in scraped_data.json, hotline name).
+# a trailing * matches any word ending ("self harm*" matches self harming), otherwise whole words.
+# only phrases that are clear on their own belong here, anything vaguer is left to the LLM.
+# a bare "suicide" is not one of them ("suicide prevention month")
+RISK_LEXICON = {
+    "Serious and Urgent": ("Emergency (Fire, police, ambulance)", [
+        "overdosed", "overdosing", "took too many pills", "took a bunch of pills", "swallowed pills",
+        "swallowed a bottle of", "bleeding out", "cant stop the bleeding", "not breathing", "cant breathe",
+        "heart attack", "has a gun", "going to kill him", "going to kill her", "going to kill them",
+        "breaking into my house",
+    ]),
+    "Suicide": ("Suicide Hotline", [
+        "suicidal", "commit suicide", "committing suicide", "attempt suicide", "thinking about suicide",
+        "thoughts of suicide", "kill myself", "killing myself", "end my life", "ending my life", "take my own life",
+        "take my life", "want to die", "wanna die", "better off dead", "dont want to live",
+        "dont want to be alive", "no reason to live", "end it all", "hang myself", "shoot myself",
+        "jump off a bridge",
+        # passive ideation
+        "cant go on anymore", "cant go on like this", "want to disappear", "wish i was dead", "wish i were dead",
+        "wish i wasnt alive", "wish i was never born", "dont want to wake up", "want it all to end",
+        "nothing to live for", "no point in living", "tired of living", "tired of being alive", "better off without me",
+    ]),
+    "Self-Injury": ("S.A.F.E. (Self Abuse Finally Ends)", [
+        "cut myself", "cutting myself", "hurt myself", "hurting myself", "harm myself", "harming myself",
+        "self harm*", "burn myself", "burned myself", "burning myself",
+    ]),
+    "Poison": ("Poison Control", [
+        "drank bleach", "swallowed bleach", "been poisoned", "got poisoned", "ate rat poison",
+    ]),
+    "Abuse": ("National Sexual Assault Hotline", [
+        "raped", "sexually assaulted", "molested", "molesting me",
+    ]),
+    "Domestic Violence": ("National Domestic Violence Hotline", [
+        "he hits me", "she hits me", "beats me", "beat me up", "threatened to kill me",
+        "afraid he will kill me", "afraid she will kill me", "choked me", "strangled me",
+    ]),
+}
+# lower is more serious, the most serious match decides the hotline
+SEVERITY = {category: rank for rank, category in enumerate(RISK_LEXICON)}
+# figures of speech around a lexicon phrase, a match overlapping one of these doesn't count
+IDIOMS = [
+    "die laughing", "dying laughing", "die of laughter", "die of embarrassment", "die of boredom",
+    "to die for", "myself laughing",
+]
+# "i will never kill myself", "im not suicidal": one of these in the words right before
+# a phrase turns it around. only two words back so "im not ok i want to die" still counts,
+# and never past the start of the clause so "no, i want to die" does too
+NEGATIONS = {"not", "never", "no", "dont", "didnt", "doesnt", "wont", "wouldnt", "isnt", "wasnt", "arent", "nor"}
+NEGATION_WINDOW = 2
+CLAUSE_BREAKS = {".", "but"}
+
+CRISIS_MESSAGE = (
+    "It sounds like you are going through something really painful, and you don't have to face it alone. "
+    "Please reach out to {name} at {phone} right now, they are there to help."
+)
+
+CLAUSE_PUNCTUATION = re.compile(r"[,.;:!?]+")
+NON_WORD = re.compile(r"[^a-z0-9.]+")
+
+
+def normalize(text):
+    # apostrophes dropped so "don't" and "dont" are the same word. clause punctuation
+    # becomes a lone "." word, no phrase spans it, everything else just splits words
+    text = CLAUSE_PUNCTUATION.sub(" . ", text.lower().replace("'", "").replace("’", ""))
+    return " " + NON_WORD.sub(" ", text).strip() + " "
+
+
+def negated(words_before):
+    '''
+    whether the last words of the clause before a phrase negate it
+    '''
+    clause = []
+    for word in reversed(words_before[-NEGATION_WINDOW:]):
+        if word in CLAUSE_BREAKS:
+            break
+        clause.append(word)
+    return bool(NEGATIONS.intersection(clause))
+
+
+class RiskMatcher:
+    '''
+    Aho-Corasick automaton over the lexicon phrases: one pass over the text finds
+    every phrase at once, however many there are
+    '''
+
+    def __init__(self, phrases):
+        # node 0 is the root, each node has its transitions, failure link and outputs
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for phrase, value in phrases:
+            stem = phrase.endswith("*")
+            key = normalize(phrase.rstrip("*"))
+            if stem:
+                key = key.rstrip()
+            self._insert(key, value)
+        self._link()
+
+    def _insert(self, key, value):
+        node = 0
+        for char in key:
+            if char not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+                self.goto[node][char] = len(self.goto) - 1
+            node = self.goto[node][char]
+        self.out[node].append((len(key), value))
+
+    def _link(self):
+        # breadth first so a node's failure link is always set before its children's.
+        # the root's children fail back to the root, which the initial 0 already says
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find(self, text):
+        '''
+        (start, end, value) of every phrase found in `text`, in the order they end.
+        positions are in normalize(text)
+        '''
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        found = []
+        for i, char in enumerate(normalize(text)):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, value in out[node]:
+                found.append((i + 1 - length, i + 1, value))
+        return found
+
+
+class CrisisDetector:
+    '''
+    local fast path for /process_text and /process_audio: when the text has a clear
+    risk signal, the hotline is known before any LLM call is made
+    '''
+
+    def __init__(self, hotline_index, lexicon=RISK_LEXICON, idioms=IDIOMS):
+        phrases = [(idiom, None) for idiom in idioms]
+        for category, (name, terms) in lexicon.items():
+            phone = dict(hotline_index.directory.get(category, [])).get(name)
+            if phone is None:
+                raise ValueError(f"{name!r} is not listed under {category!r} in the hotline directory")
+            phrases.extend((term, (category, name, phone, term)) for term in terms)
+        self.matcher = RiskMatcher(phrases)
+
+    def check(self, text):
+        '''
+        {"category", "name", "phone", "term"} for the most serious match, or None
+        '''
+        text = text or ""
+        found = self.matcher.find(text)
+        idioms = [(start, end) for start, end, value in found if value is None]
+        words = normalize(text)
+        hits = [
+            value for start, end, value in found
+            if value is not None
+            and not any(start < idiom_end and idiom_start < end for idiom_start, idiom_end in idioms)
+            and not negated(words[:start].split())
+        ]
+        if not hits:
+            return None
+        category, name, phone, term = min(hits, key=lambda f: SEVERITY[f[0]])
+        return {"category": category, "name": name, "phone": phone, "term": term.rstrip("*")}
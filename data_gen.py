@@ -1,8 +1,13 @@
 # populate_mock_data.py
 
+import math
+import time
+import random
+import argparse
 from pymongo import MongoClient, ASCENDING
 from datetime import datetime, timedelta
 from bson import ObjectId
+from db_indexes import ensure_indexes
 
 def populate_mock_data():
     # Connect to MongoDB
@@ -20,9 +25,7 @@ def populate_mock_data():
     prescriptions.delete_many({})
 
     user_info.create_index([("user_id", ASCENDING)], unique=True)
-    prescriptions.create_index([("user_id", ASCENDING)])
-    user_data.create_index([("user_id", ASCENDING), ("type", ASCENDING)])
-    user_data.create_index([("goal_id", ASCENDING)])
+    ensure_indexes(db)
 
     # 1. Create users: Jane Doe and John Doe
     users = [
@@ -647,5 +650,274 @@ Email: contact@healthymindsclinic.com
 
     print("Mock data population complete.")
 
+# ---------------------------------------------------------------------------
+# synthetic data at scale, same document shapes as populate_mock_data above
+
+PATIENTS = [
+    ("Generalized Anxiety Disorder (GAD)", [
+        ("Take Calmvera 10 mg", "Take one tablet orally twice daily after meals.", "60 tablets"),
+        ("Take Restwell XR 50 mg", "Take one capsule orally at bedtime.", "30 capsules"),
+    ]),
+    ("Post-Traumatic Stress Disorder (PTSD)", [
+        ("Take Restwell XR 50 mg", "Take one capsule orally at bedtime.", "30 capsules"),
+    ]),
+    ("Anorexia Nervosa", [
+        ("Take AppetiGrow 5 mg", "Take one tablet orally once daily in the morning with food.", "30 tablets"),
+        ("Take MoodLift XR 75 mg", "Take one capsule orally at bedtime.", "30 capsules"),
+    ]),
+    ("Major Depressive Disorder", [
+        ("Take MoodLift XR 75 mg", "Take one capsule orally at bedtime.", "30 capsules"),
+    ]),
+]
+ACTIVITIES = [
+    ("Attend Cognitive Behavioral Therapy (CBT) Sessions", "Attend weekly Cognitive Behavioral Therapy (CBT) sessions with a licensed therapist."),
+    ("Daily Mindfulness Meditation", "Engage in daily mindfulness meditation for at least 15 minutes."),
+    ("Physical Exercise", "Participate in moderate physical activity (e.g., walking, yoga) for 30 minutes, at least 5 days a week."),
+    ("Establish Sleep Hygiene", "Establish a regular sleep schedule aiming for 7-9 hours of quality sleep per night."),
+    ("Daily Journaling", "Write in a journal daily to reflect on thoughts and emotions."),
+    ("Nutritional Counseling", "Meet with a registered dietitian weekly to develop a personalized meal plan."),
+]
+NOTES = [
+    ("Completed my daily mindfulness meditation session. Feeling more centered.", "Positive experience with mindfulness meditation.", "POSITIVE", "CENTERED"),
+    ("Started a new yoga routine today, feeling more flexible and relaxed.", "Positive experience with new yoga routine.", "POSITIVE", "RELAXED"),
+    ("Struggled with appetite today, but had a nutritious meal plan.", "Managing symptoms with meal planning.", "NEUTRAL", "NERVOUS"),
+    ("Couldn't sleep again, my mind kept racing about work.", "Trouble sleeping because of work stress.", "NEGATIVE", "ANXIOUS"),
+    ("Had a meeting with my dietitian today. Updated my meal plan.", "Nutritional counseling session to improve meal plan.", "POSITIVE", "HOPEFUL"),
+    ("Felt low most of the day and skipped my walk.", "Low mood and missed activity.", "NEGATIVE", "SAD"),
+]
+BOT_CONVERSATIONS = [
+    ([("bot", "Hi {first}, how are you feeling today?"), ("user", "I've been feeling quite anxious lately."),
+      ("bot", "I'm sorry to hear that. Would you like some techniques to manage your anxiety?"), ("user", "Yes, please."),
+      ("bot", "Consider practicing deep breathing exercises or taking a short walk to help calm your mind.")],
+     "Bot initiated conversation about user's anxiety and provided management techniques.", "NEGATIVE", "ANXIOUS",
+     "User is experiencing anxiety and is open to management techniques."),
+    ([("bot", "Remember to take your medication."), ("user", "Thanks for the reminder! I've taken it this morning."),
+      ("bot", "Great! Keep it up.")],
+     "Bot reminded user to take medication.", "NEUTRAL", "NEUTRAL", "User acknowledged medication reminder."),
+    ([("bot", "Good morning, {first}! How did you sleep?"), ("user", "Better than last week, I kept to my schedule."),
+      ("bot", "That's great progress. Keeping a regular bedtime really helps.")],
+     "User reported improved sleep after keeping a schedule.", "POSITIVE", "HOPEFUL", "Sleep hygiene is working for the user."),
+]
+CONNECTIONS = ["Alice Smith", "Bob Johnson", "Carla Gomez", "Dev Patel", "Emma Brown", "Farah Khan"]
+FIRST_NAMES = ["Jane", "John", "Maria", "Wei", "Aisha", "Lucas", "Sofia", "Omar", "Mia", "Noah"]
+LAST_NAMES = ["Doe", "Smith", "Garcia", "Chen", "Khan", "Silva", "Rossi", "Haddad", "Nguyen", "Brown"]
+HOTLINES = ["Mental Health Hotline", "Suicide Hotline", "Crisis Text Line"]
+# share of timeline items by type, per user the actual mix is jittered around this
+TIMELINE_MIX = {
+    "notes": 35,
+    "bot_conversation": 30,
+    "goal_completion": 20,
+    "connection_conversation": 8,
+    "connection_added": 4,
+    "emergency_call": 3,
+}
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class ChunkedWriter:
+    '''
+    buffers documents per collection and writes them with unordered insert_many
+    once `chunk_size` of them are waiting
+    '''
+
+    def __init__(self, db, chunk_size):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, collection, doc):
+        buffer = self.buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if len(buffer) >= self.chunk_size:
+            self.flush(collection)
+
+    def flush(self, collection=None):
+        for name in [collection] if collection else list(self.buffers):
+            docs = self.buffers.get(name)
+            if docs:
+                self.db[name].insert_many(docs, ordered=False)
+                self.counts[name] = self.counts.get(name, 0) + len(docs)
+                self.buffers[name] = []
+
+
+def object_id(rng, ms):
+    # real ObjectIds start with the creation time, the rest comes from the seeded rng
+    return ObjectId(int(ms // 1000).to_bytes(4, "big") + rng.getrandbits(64).to_bytes(8, "big"))
+
+
+def synthetic_user(rng, user_id, now):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    created_at = now - rng.randint(30, 720) * DAY_MS
+    diagnoses = rng.sample(PATIENTS, rng.randint(1, 2))
+    return {
+        "_id": user_id,
+        "user_id": user_id,
+        "patient_name": f"{first} {last}",
+        "username": f"{first.lower()}_{last[0].lower()}{user_id}",
+        "email": f"{first.lower()}.{last.lower()}{user_id}@example.com",
+        "date_of_birth": f"{rng.randint(1950, 2008)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "created_at": created_at,
+        "diagnosis": [name for name, _ in diagnoses],
+        "prescription_date": datetime.utcfromtimestamp(created_at / 1000).strftime("%Y-%m-%d"),
+    }, diagnoses
+
+
+def synthetic_prescription(rng, user, diagnoses, created_at, now):
+    tasks = []
+    for _, medications in diagnoses:
+        for task, dosage, quantity in medications:
+            tasks.append({
+                "type": "medication",
+                "task": task,
+                "details": {"dosage": dosage, "quantity": quantity, "refills": rng.randint(0, 2)},
+                "completed": False,
+            })
+    for task, description in rng.sample(ACTIVITIES, rng.randint(1, 3)):
+        tasks.append({"type": "therapeutic_activity", "task": task, "details": {"description": description}, "completed": False})
+    return {
+        "_id": object_id(rng, created_at),
+        "user_id": user["user_id"],
+        "prescription_date": datetime.utcfromtimestamp(created_at / 1000).strftime("%Y-%m-%d"),
+        "raw_text": f"Prescription\nPatient Name: {user['patient_name']}\nDiagnosis:\n" + "\n".join(user["diagnosis"]),
+        "tasks": tasks,
+        "created_at": created_at,
+        "expiry": created_at + rng.choice([30, 60, 90]) * DAY_MS,
+        "last_updated": min(now, created_at + rng.randint(0, 10) * DAY_MS),
+    }
+
+
+def synthetic_goal(rng, prescription, task):
+    return {
+        "_id": object_id(rng, prescription["created_at"]),
+        "user_id": prescription["user_id"],
+        "type": "goal",
+        "text": task["task"],
+        "details": task["details"],
+        "completed": task["completed"],
+        "frequency": "daily" if task["type"] == "medication" else "weekly",
+        "created_at": prescription["created_at"],
+        "last_updated": prescription["last_updated"],
+        "expiry": prescription["expiry"],
+        "prescription_id": prescription["_id"],
+    }
+
+
+def synthetic_timeline_item(rng, kind, user, timestamp, goals):
+    item = {"_id": object_id(rng, timestamp), "user_id": user["user_id"], "type": kind}
+    first = user["patient_name"].split()[0]
+    if kind == "notes":
+        content, summary, sentiment, mood = rng.choice(NOTES)
+        item.update(content=content, summary=summary, sentiment=sentiment, mood=mood)
+    elif kind == "bot_conversation":
+        turns, summary, sentiment, mood, takeaways = rng.choice(BOT_CONVERSATIONS)
+        item.update(
+            conversation_with=None,
+            conversation_type="text",
+            content=[{"sender": sender, "message": message.format(first=first)} for sender, message in turns],
+            summary=summary, sentiment=sentiment, mood=mood, takeaways=takeaways,
+        )
+    elif kind == "connection_conversation":
+        name = rng.choice(CONNECTIONS)
+        sender = name.split()[0].lower()
+        item.update(
+            conversation_with=name,
+            conversation_type="text",
+            content=[
+                {"sender": sender, "message": f"Hey {first}! Are you free for a walk this evening?"},
+                {"sender": "user", "message": f"Sure, {name.split()[0]}! That sounds nice."},
+            ],
+            summary="Connection invited user for a walk.",
+            sentiment="POSITIVE", mood="HAPPY",
+            takeaways="User has a physical activity planned with a connection.",
+        )
+    elif kind == "connection_added":
+        name = rng.choice(CONNECTIONS)
+        item.update(connection_name=name, connection_user_id=f"{name.split()[0].lower()}_id_{rng.randint(100, 999)}")
+    elif kind == "emergency_call":
+        item["hotline_called"] = rng.choice(HOTLINES)
+    elif kind == "goal_completion":
+        goal = rng.choice(goals)
+        item.update(goal_id=goal["_id"], task=goal["text"], completed=True)
+    item["timestamp"] = timestamp
+    return item
+
+
+def generate_synthetic_data(users=1000, median_items=50, seed=42, first_user_id=1000, chunk_size=5000,
+                            now=None, mongo_uri="mongodb://localhost:27017/", db_name="main_db", reset=True):
+    '''
+    `users` users starting at `first_user_id`, each with prescriptions, the goals
+    they imply and a timeline. activity is heavy tailed: items per user are
+    lognormal around `median_items`, so a few users have long histories and most
+    have short ones. the same seed (and `now`, in ms) gives the same documents,
+    _ids included. with reset the generated user id range is cleared first, other
+    users are left alone. returns the number of documents written per collection
+    '''
+    rng = random.Random(seed)
+    now = now if now is not None else int(datetime.utcnow().timestamp() * 1000)
+    db = MongoClient(mongo_uri)[db_name]
+    user_ids = range(first_user_id, first_user_id + users)
+    if reset:
+        for name in ("user_info", "user_data", "prescriptions"):
+            db[name].delete_many({"user_id": {"$gte": user_ids.start, "$lt": user_ids.stop}})
+
+    writer = ChunkedWriter(db, chunk_size)
+    kinds, weights = list(TIMELINE_MIX), list(TIMELINE_MIX.values())
+    started = time.perf_counter()
+    for user_id in user_ids:
+        user, diagnoses = synthetic_user(rng, user_id, now)
+        writer.add("user_info", user)
+
+        goals = []
+        for _ in range(rng.randint(1, 3)):
+            prescription = synthetic_prescription(rng, user, diagnoses, rng.randint(user["created_at"], now), now)
+            writer.add("prescriptions", prescription)
+            for task in prescription["tasks"]:
+                goal = synthetic_goal(rng, prescription, task)
+                goals.append(goal)
+                writer.add("user_data", goal)
+
+        count = min(int(median_items * math.exp(rng.gauss(0, 1))), median_items * 50)
+        user_weights = [w * rng.uniform(0.5, 1.5) for w in weights]
+        for kind in rng.choices(kinds, user_weights, k=count):
+            writer.add("user_data", synthetic_timeline_item(rng, kind, user, rng.randint(user["created_at"], now), goals))
+
+        if (user_id - first_user_id + 1) % 1000 == 0:
+            done = sum(writer.counts.values())
+            print(f"{user_id - first_user_id + 1}/{users} users, {done} documents, {done / (time.perf_counter() - started):.0f} docs/s")
+    writer.flush()
+
+    # a fresh database gets its indexes here, built once after the bulk load. in one that
+    # already has them (seeded before, or the server has run) the inserts above kept them
+    # up to date and this is a no-op. they're not dropped first since the database may
+    # hold other users and be in use
+    db["user_info"].create_index([("user_id", ASCENDING)], unique=True)
+    ensure_indexes(db)
+
+    elapsed = time.perf_counter() - started
+    total = sum(writer.counts.values())
+    print(f"Generated {total} documents for {users} users in {elapsed:.1f}s ({total / elapsed:.0f} docs/s): {writer.counts}")
+    return writer.counts
+
+
 if __name__ == "__main__":
-    populate_mock_data()
+    # no arguments: the two demo users. e.g. --users 10000 --median-items 60 for ~1M documents
+    parser = argparse.ArgumentParser(description="demo data, or synthetic data at scale with --users")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--median-items", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--first-user-id", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--now", type=int, help="time anchor in ms, pin it for identical runs")
+    args = parser.parse_args()
+    if args.users:
+        generate_synthetic_data(
+            users=args.users,
+            median_items=args.median_items,
+            seed=args.seed,
+            first_user_id=args.first_user_id,
+            chunk_size=args.chunk_size,
+            now=args.now,
+        )
+    else:
+        populate_mock_data()
@@ -0,0 +1,47 @@
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+# one index per query shape in mongo_functions, flask_server and enrichment,
+# check_query_plans.py explains each of those queries against them. names are left
+# to mongo, so an index with the same keys made earlier (by hand, by data_gen or by
+# the old create_timeline_indexes) counts as the same index and isn't built twice
+INDEXES = {
+    "user_data": [
+        # get_timeline, the descending pages and the ascending `after` pages both walk it
+        [("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+        # get_timeline with a type filter, get_goals
+        [("user_id", ASCENDING), ("type", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+        # resume_pending_enrichment on startup
+        [("enrichment_status", ASCENDING)],
+    ],
+    "prescriptions": [
+        # get_prescriptions, newest first
+        [("user_id", ASCENDING), ("created_at", DESCENDING)],
+    ],
+    "user_info": [
+        # /api/user/userid/<username>
+        [("username", ASCENDING)],
+    ],
+}
+# IndexOptionsConflict and IndexKeySpecsConflict, the keys are indexed already with other options
+CONFLICT_CODES = (85, 86)
+
+
+def ensure_indexes(db, indexes=INDEXES):
+    '''
+    creates whatever in `indexes` is missing from `db`, nothing happens for the
+    ones that exist so it's safe on every start. never drops or rebuilds an index.
+    returns the index names per collection
+    '''
+    names = {}
+    for collection, specs in indexes.items():
+        for keys in specs:
+            try:
+                name = db[collection].create_index(keys)
+            except OperationFailure as e:
+                if e.code not in CONFLICT_CODES:
+                    raise
+                print(f"Keeping the existing index on {collection} {keys}: {e}")
+                continue
+            names.setdefault(collection, []).append(name)
+    return names
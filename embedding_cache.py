@@ -0,0 +1,157 @@
+import os
+import json
+import hashlib
+import fcntl
+import threading
+from contextlib import contextmanager
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".embedding_cache")
+
+
+class CachedEmbeddings(Embeddings):
+    '''
+    wraps a langchain Embeddings and keeps every vector it has produced on disk.
+
+    <dir>/<model>/keys.txt     one sha256(model, text) per line, line n is row n
+    <dir>/<model>/vectors.f32  rows of float32, read back through np.memmap
+    <dir>/<model>/meta.json    model name and dimension
+    <dir>/<model>/lock         flock'd around every write, server workers and load.py share the files
+    '''
+
+    def __init__(self, embeddings, model, directory=EMBEDDING_CACHE_DIR):
+        self.embeddings = embeddings
+        self.model = model
+        self.directory = os.path.join(directory, model.replace("/", "_"))
+        self.keys_path = os.path.join(self.directory, "keys.txt")
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.meta_path = os.path.join(self.directory, "meta.json")
+        self.lock_path = os.path.join(self.directory, "lock")
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rows = {}
+        # rows read so far and where they end in keys.txt
+        self.count = 0
+        self.keys_offset = 0
+        self.dim = None
+        self.matrix = None
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        with self._file_lock():
+            self._sync()
+        self._map()
+
+    def _sync(self):
+        '''
+        reads the rows appended since the last sync, by this process or another one.
+        the caller holds the file lock, so a row only one of the files has is left
+        over from a writer that crashed between the two appends and is cut off
+        '''
+        if self.dim is None:
+            if not os.path.exists(self.meta_path):
+                return
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)["dim"]
+        row_bytes = 4 * self.dim
+        with open(self.keys_path, "a+b") as keys_file, open(self.vectors_path, "a+b") as vectors_file:
+            keys_file.seek(self.keys_offset)
+            # the last piece is "" or a line cut short by a crash
+            lines = keys_file.read().split(b"\n")[:-1]
+            stored = vectors_file.seek(0, os.SEEK_END) // row_bytes
+            for line in lines[:max(0, stored - self.count)]:
+                self.rows[line.decode()] = self.count
+                self.count += 1
+                self.keys_offset += len(line) + 1
+            keys_file.truncate(self.keys_offset)
+            vectors_file.truncate(self.count * row_bytes)
+
+    def _refresh(self):
+        # another process may have embedded it already, cheaper than asking the provider
+        with self._file_lock():
+            self._sync()
+        self._map()
+
+    def _map(self):
+        if self.count:
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model}\0{text}".encode()).hexdigest()
+
+    def _store(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._file_lock():
+            # rows are numbered by position in the files, so catch up before appending
+            self._sync()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self.meta_path, "w") as f:
+                    json.dump({"model": self.model, "dim": self.dim}, f)
+            new = [i for i, key in enumerate(keys) if key not in self.rows]
+            if new:
+                with open(self.vectors_path, "ab") as f:
+                    f.write(vectors[new].tobytes())
+                with open(self.keys_path, "ab") as f:
+                    f.write("".join(keys[i] + "\n" for i in new).encode())
+                for i in new:
+                    self.rows[keys[i]] = self.count
+                    self.count += 1
+                    self.keys_offset += len(keys[i]) + 1
+        self._map()
+
+    def embed_documents(self, texts):
+        keys = [self.key(text) for text in texts]
+        with self.lock:
+            if any(key not in self.rows for key in keys):
+                self._refresh()
+            missing = list(dict.fromkeys(key for key in keys if key not in self.rows))
+        missing_set = set(missing)
+        missed = sum(1 for key in keys if key in missing_set)
+        self.hits += len(keys) - missed
+        self.misses += missed
+        if missing:
+            text_for_key = dict(zip(keys, texts))
+            vectors = self.embeddings.embed_documents([text_for_key[key] for key in missing])
+            with self.lock:
+                new = [(key, vector) for key, vector in zip(missing, vectors) if key not in self.rows]
+                if new:
+                    self._store([key for key, _ in new], [vector for _, vector in new])
+        with self.lock:
+            return [self.matrix[self.rows[key]].tolist() for key in keys]
+
+    def embed_query(self, text):
+        key = self.key(text)
+        with self.lock:
+            if key not in self.rows:
+                self._refresh()
+            if key in self.rows:
+                self.hits += 1
+                return self.matrix[self.rows[key]].tolist()
+        self.misses += 1
+        vector = self.embeddings.embed_query(text)
+        with self.lock:
+            if key not in self.rows:
+                self._store([key], [vector])
+        return vector
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.rows),
+        }
@@ -0,0 +1,105 @@
+import os
+import time
+import random
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import ValidationError
+from sentiment import get_sentiment
+from summary import get_summary
+from takeaways import get_takeaways
+from mood import get_mood
+from combined import get_combined_enrichment
+
+# summary/mood/takeaways are LLM round trips, so keep them out of the request thread
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "4"))
+ENRICHMENT_MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", "3"))
+ENRICHMENT_BACKOFF = float(os.getenv("ENRICHMENT_BACKOFF", "2"))
+# a "processing" claim older than this belongs to a worker that died, others may take it over
+ENRICHMENT_LEASE = float(os.getenv("ENRICHMENT_LEASE", "900"))
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+executor = ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS, thread_name_prefix="enrichment")
+
+
+def enrich(data, with_takeaways=False):
+    sentiment = get_sentiment(data)
+    try:
+        fields = get_combined_enrichment(data, sentiment, with_takeaways)
+    except (ValidationError, ValueError) as e:
+        # the model didn't return valid JSON, fall back to one call per field
+        print(f"Combined enrichment failed, falling back to separate calls: {e}")
+        fields = {"summary": get_summary(data), "mood": get_mood(data, sentiment)}
+        if with_takeaways:
+            fields["takeaways"] = get_takeaways(data)
+    fields["sentiment"] = sentiment
+    return fields
+
+
+def claimable():
+    '''
+    documents no live worker is enriching: pending ones, and processing ones whose
+    claim ran past ENRICHMENT_LEASE (or predates claims)
+    '''
+    return {"$or": [
+        {"enrichment_status": PENDING},
+        {"enrichment_status": PROCESSING, "claimed_at": {"$not": {"$gte": datetime.utcnow() - timedelta(seconds=ENRICHMENT_LEASE)}}},
+    ]}
+
+
+def claim(collection, doc_id):
+    # atomic, so with several server workers resuming at once only one of them gets it
+    return collection.find_one_and_update(
+        {"_id": doc_id, **claimable()},
+        {"$set": {"enrichment_status": PROCESSING, "claimed_at": datetime.utcnow()}},
+        projection={"_id": 1},
+    ) is not None
+
+
+def run_enrichment(collection, doc_id, data, with_takeaways=False):
+    if not claim(collection, doc_id):
+        return
+    error = None
+    for attempt in range(1, ENRICHMENT_MAX_ATTEMPTS + 1):
+        if attempt > 1:
+            # keep the lease while retrying
+            collection.update_one({"_id": doc_id}, {"$set": {"claimed_at": datetime.utcnow()}})
+        try:
+            fields = enrich(data, with_takeaways)
+            fields["enrichment_status"] = DONE
+            fields["enrichment_attempts"] = attempt
+            collection.update_one({"_id": doc_id}, {"$set": fields, "$unset": {"enrichment_error": ""}})
+            return
+        except Exception as e:
+            error = str(e)
+            print(f"Enrichment of {doc_id} failed (attempt {attempt}/{ENRICHMENT_MAX_ATTEMPTS}): {error}")
+            if attempt < ENRICHMENT_MAX_ATTEMPTS:
+                time.sleep(ENRICHMENT_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+    collection.update_one(
+        {"_id": doc_id},
+        {"$set": {"enrichment_status": FAILED, "enrichment_attempts": ENRICHMENT_MAX_ATTEMPTS, "enrichment_error": error}},
+    )
+
+
+def submit_enrichment(collection, doc_id, data, with_takeaways=False):
+    return executor.submit(run_enrichment, collection, doc_id, data, with_takeaways)
+
+
+def resume_pending_enrichment(collection):
+    '''
+    requeue documents that were stored but never enriched, e.g. after a restart.
+    every server worker runs this, run_enrichment's claim keeps them from doing a
+    document twice or taking one another worker is still on
+    '''
+    count = 0
+    for doc in collection.find(claimable(), {"type": 1, "content": 1}):
+        if doc["type"] == "notes":
+            submit_enrichment(collection, doc["_id"], doc["content"])
+        else:
+            conversation = [{"role": i["sender"], "content": i["message"]} for i in doc["content"]]
+            submit_enrichment(collection, doc["_id"], conversation, with_takeaways=True)
+        count += 1
+    return count
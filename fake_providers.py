@@ -0,0 +1,603 @@
+import os
+import re
+import sys
+import json
+import time
+import math
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from email import message_from_bytes, policy
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+import numpy as np
+import requests
+
+# python fake_providers.py [--port 8089] [--mode fake|record|replay] [--cassette cassettes/providers.jsonl]
+#                          [--latency chat=lognormal:500,0.5] [--token-ms 20] [--error-rate 0.02] [--seed 0]
+#
+# a local stand-in for the parts of OpenAI (chat, structured parse, embeddings,
+# transcription, speech), Gemini generate_content and a Pinecone index that this
+# project calls, so flask_server can be load tested offline. point it here with
+#
+#   OPENAI_BASE_URL=http://localhost:8089/v1 GEMINI_ENDPOINT=http://localhost:8089 \
+#   PINECONE_INDEX_HOST=http://localhost:8089 python flask_server.py
+#
+# fake:   answers are made up, but the same request always gets the same answer
+# record: forwards to the real APIs (--openai-upstream etc.) and appends every
+#         exchange to the cassette, one JSON object per line
+# replay: answers from the cassette only, unknown requests get a 599 (or a fake
+#         answer with --on-miss fake)
+#
+# GET /_fake/stats returns request, error and cassette hit counts per route
+
+DEFAULT_LATENCY = {
+    "chat": "lognormal:500,0.5",
+    "embeddings": "lognormal:80,0.3",
+    "transcription": "lognormal:800,0.4",
+    "speech": "lognormal:600,0.4",
+    "gemini": "lognormal:700,0.5",
+    "pinecone": "lognormal:40,0.3",
+}
+EMBEDDING_DIMENSIONS = 1536
+
+REPLY_SENTENCES = [
+    "I hear you, and it makes sense that you feel this way.",
+    "Thank you for trusting me with something so personal.",
+    "It might help to take a few slow breaths before deciding what to do next.",
+    "You don't have to work through all of this at once.",
+    "Talking to someone who has been through something similar can make a real difference.",
+    "What you're feeling is valid, even if it's hard to put into words.",
+    "Small steps, like a short walk or a glass of water, still count.",
+    "Would you like to tell me a little more about what happened today?",
+]
+TRANSCRIPTS = [
+    "I've been feeling really anxious about work lately and I can't sleep.",
+    "Today was a good day, I went for a walk and called my sister.",
+    "I forgot to take my medication this morning, what should I do?",
+    "I feel lonely since I moved to a new city.",
+    "I'm overwhelmed with exams and I don't know where to start.",
+]
+
+
+def parse_latency(spec):
+    '''
+    "fixed:ms", "uniform:lo_ms,hi_ms", "normal:mean_ms,std_ms" or "lognormal:median_ms,sigma",
+    returns a function of a random.Random giving seconds
+    '''
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal":
+        return lambda rng: values[0] * math.exp(rng.gauss(0, values[1])) / 1000
+    raise ValueError(f"Unknown latency distribution {spec!r}")
+
+
+def fake_embedding(tokens, dimensions=EMBEDDING_DIMENSIONS):
+    # hashed bag of words: deterministic, and texts sharing words end up close together
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token in tokens:
+        digest = hashlib.sha1(str(token).encode()).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = 1.0
+        return vector
+    return vector / norm
+
+
+def embedding_tokens(item):
+    # the openai SDK sends text, langchain sends tiktoken ids, which are turned back
+    # into text when tiktoken is around so both end up next to the seeded chunks
+    if not isinstance(item, str):
+        try:
+            import tiktoken
+        except ImportError:
+            return item
+        item = tiktoken.get_encoding("cl100k_base").decode(item)
+    return re.findall(r"[a-z0-9']+", item.lower())
+
+
+def stream_pieces(text):
+    # roughly token sized pieces, joined back they are exactly `text`
+    return re.findall(r"\s*\S{1,6}|\s+", text)
+
+
+def fake_value(schema, defs, name, text, rng):
+    '''
+    a value matching a JSON schema (the subset pydantic produces), "message" and
+    "response" strings get the fake reply text
+    '''
+    if "$ref" in schema:
+        return fake_value(defs[schema["$ref"].split("/")[-1]], defs, name, text, rng)
+    if "anyOf" in schema:
+        return fake_value(schema["anyOf"][0], defs, name, text, rng)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: fake_value(sub, defs, key, text, rng) for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [fake_value(schema.get("items", {}), defs, name, text, rng)]
+    if kind == "integer":
+        return rng.randint(0, 100)
+    if kind == "number":
+        return round(rng.uniform(0, 1), 3)
+    if kind == "boolean":
+        return False
+    if name in ("message", "response", "summary", "text"):
+        return text
+    return f"{name} {rng.randint(1, 999)}"
+
+
+class Cassette:
+    '''
+    recorded exchanges, one JSON object per line, keyed by a hash of the request
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def add(self, entry):
+        with self.lock:
+            self.entries[entry["key"]] = entry
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+class FakeProviders:
+    def __init__(self, args):
+        self.mode = args.mode
+        self.on_miss = args.on_miss
+        self.seed = args.seed
+        self.token_s = args.token_ms / 1000
+        self.error_rate = args.error_rate
+        self.latency = {route: parse_latency(spec) for route, spec in DEFAULT_LATENCY.items()}
+        for item in args.latency:
+            route, _, spec = item.partition("=")
+            self.latency[route] = parse_latency(spec)
+        self.upstreams = {"openai": args.openai_upstream, "gemini": args.gemini_upstream, "pinecone": args.pinecone_upstream}
+        self.cassette = Cassette(args.cassette) if args.mode != "fake" else None
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.seen = {}
+        self.stats = {}
+        # namespace -> id -> (vector, metadata)
+        self.index = {}
+        if args.pinecone_seed and os.path.exists(args.pinecone_seed):
+            self.seed_index(args.pinecone_seed)
+
+    def seed_index(self, path):
+        # people.txt chunked on ";" like load.py, so /recommend has someone to recommend
+        with open(path) as f:
+            chunks = [c.strip() for c in f.read().split(";") if c.strip()]
+        namespace = self.index.setdefault("", {})
+        for chunk in chunks:
+            _id = hashlib.sha256(chunk.encode()).hexdigest()
+            namespace[_id] = (fake_embedding(embedding_tokens(chunk)), {"text": chunk, "source": path})
+        print(f"Seeded the fake index with {len(chunks)} chunks from {path}")
+
+    def count(self, route, field):
+        with self.lock:
+            stats = self.stats.setdefault(route, {"requests": 0, "errors": 0, "replayed": 0, "recorded": 0, "missed": 0})
+            stats[field] += 1
+
+    def rng_for(self, key):
+        # seeded per request and per repeat, so latencies don't depend on arrival order
+        with self.lock:
+            n = self.seen[key] = self.seen.get(key, 0) + 1
+        return random.Random(f"{self.seed}:{key}:{n}")
+
+
+def route_for(method, path):
+    '''
+    (provider, route) for a request path, None for unknown ones
+    '''
+    if path.startswith("/v1/chat/completions"):
+        return "openai", "chat"
+    if path.startswith("/v1/embeddings"):
+        return "openai", "embeddings"
+    if path.startswith("/v1/audio/transcriptions"):
+        return "openai", "transcription"
+    if path.startswith("/v1/audio/speech"):
+        return "openai", "speech"
+    if re.match(r"^/v1(beta)?/models/[^/:]+:(generateContent|streamGenerateContent)", path):
+        return "gemini", "gemini"
+    if path in ("/query", "/vectors/upsert", "/vectors/delete", "/describe_index_stats"):
+        return "pinecone", "pinecone"
+    return None
+
+
+def silent_mp3(seconds):
+    # MPEG-1 layer III, 128 kbps, 44.1 kHz frames with empty side info, which decode as silence
+    frame = bytes([0xFF, 0xFB, 0x90, 0x00]) + bytes(413)
+    return frame * max(1, int(seconds / 0.026))
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/_fake/stats":
+            with self.fake.lock:
+                self.send_json(200, {"mode": self.fake.mode, "routes": self.fake.stats})
+            return
+        self.handle_provider()
+
+    def do_POST(self):
+        self.handle_provider()
+
+    def do_DELETE(self):
+        self.handle_provider()
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_json(self, status, body, headers=None):
+        self.send_bytes(status, json.dumps(body).encode(), "application/json", headers)
+
+    def send_bytes(self, status, data, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunks(self, status, chunks, content_type, delay):
+        # chunked transfer encoding so the connection stays reusable, `delay` between chunks
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not chunk:
+                continue
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+            if delay:
+                time.sleep(delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def decode_body(self, raw):
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            message = message_from_bytes(
+                f"Content-Type: {content_type}\r\n\r\n".encode() + raw, policy=policy.HTTP
+            )
+            fields = {}
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                payload = part.get_payload(decode=True) or b""
+                fields[name] = payload if part.get_filename() else payload.decode()
+            return fields
+        if raw and ("json" in content_type or raw[:1] in (b"{", b"[")):
+            return json.loads(raw)
+        return {}
+
+    def request_key(self, body):
+        path = urlsplit(self.path).path
+        canonical = {
+            k: (hashlib.sha256(v).hexdigest() if isinstance(v, bytes) else v) for k, v in body.items()
+        } if isinstance(body, dict) else body
+        return hashlib.sha256(f"{self.command} {path} {json.dumps(canonical, sort_keys=True)}".encode()).hexdigest()[:32]
+
+    def handle_provider(self):
+        fake = self.fake
+        path = urlsplit(self.path).path
+        raw = self.read_body()
+        found = route_for(self.command, path)
+        if found is None:
+            self.send_json(404, {"error": {"message": f"fake providers: no route for {self.command} {path}"}})
+            return
+        provider, route = found
+        body = self.decode_body(raw)
+        key = self.request_key(body)
+        rng = fake.rng_for(key)
+        fake.count(route, "requests")
+
+        if fake.mode == "record":
+            self.record(provider, route, key, raw)
+            return
+        if fake.mode == "replay":
+            entry = fake.cassette.get(key)
+            if entry is not None:
+                fake.count(route, "replayed")
+                self.replay(entry, route, rng)
+                return
+            fake.count(route, "missed")
+            if fake.on_miss != "fake":
+                self.send_json(599, {"error": {"message": f"fake providers: {self.command} {path} ({key}) is not in the cassette"}})
+                return
+
+        time.sleep(fake.latency[route](rng))
+        if rng.random() < fake.error_rate:
+            fake.count(route, "errors")
+            self.send_error_for(provider, rng)
+            return
+        getattr(self, f"fake_{route}")(path, body, rng)
+
+    def send_error_for(self, provider, rng):
+        status = rng.choice([429, 500, 503])
+        headers = {"Retry-After": "1"} if status == 429 else {}
+        if provider == "gemini":
+            body = {"error": {"code": status, "message": "fake provider injected error", "status": "UNAVAILABLE"}}
+        elif provider == "pinecone":
+            body = {"code": 14, "message": "fake provider injected error"}
+        else:
+            body = {"error": {"message": "fake provider injected error", "type": "server_error", "code": None}}
+        self.send_json(status, body, headers)
+
+    # -- OpenAI ---------------------------------------------------------------
+
+    def reply_text(self, rng):
+        return " ".join(rng.sample(REPLY_SENTENCES, rng.randint(2, 4)))
+
+    def fake_chat(self, path, body, rng):
+        model = body.get("model", "gpt-4o")
+        text = self.reply_text(rng)
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            text = json.dumps(fake_value(schema, schema.get("$defs", {}), "", text, rng))
+        elif response_format.get("type") == "json_object":
+            text = json.dumps({"response": text})
+        pieces = stream_pieces(text)
+        prompt_tokens = sum(len(str(m.get("content", ""))) // 4 for m in body.get("messages", []))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(pieces), "total_tokens": prompt_tokens + len(pieces)}
+        completion_id = f"chatcmpl-fake{rng.getrandbits(48):x}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            time.sleep(self.fake.token_s * len(pieces))
+            self.send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "system_fingerprint": "fake",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text, "refusal": None},
+                    "logprobs": None,
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+            return
+
+        def chunk(delta, finish_reason=None, **extra):
+            return "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "system_fingerprint": "fake",
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}],
+                **extra,
+            }) + "\n\n"
+
+        events = [chunk({"role": "assistant", "content": "", "refusal": None})]
+        events += [chunk({"content": piece}) for piece in pieces]
+        events.append(chunk({}, "stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            events.append("data: " + json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                "model": model, "choices": [], "usage": usage,
+            }) + "\n\n")
+        events.append("data: [DONE]\n\n")
+        self.send_chunks(200, events, "text/event-stream", self.fake.token_s)
+
+    def fake_embeddings(self, path, body, rng):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS
+        data = []
+        for i, item in enumerate(inputs):
+            vector = fake_embedding(embedding_tokens(item), dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(embedding_tokens(item)) for item in inputs)
+        self.send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    def fake_transcription(self, path, body, rng):
+        audio = body.get("file", b"")
+        text = TRANSCRIPTS[int(hashlib.sha256(audio).hexdigest(), 16) % len(TRANSCRIPTS)]
+        if body.get("response_format") == "text":
+            self.send_bytes(200, text.encode(), "text/plain")
+            return
+        self.send_json(200, {"text": text})
+
+    def fake_speech(self, path, body, rng):
+        # ~15 characters of speech per second
+        audio = silent_mp3(len(body.get("input", "")) / 15)
+        chunks = [audio[i:i + 4096] for i in range(0, len(audio), 4096)]
+        self.send_chunks(200, chunks, "audio/mpeg", self.fake.token_s)
+
+    # -- Gemini ---------------------------------------------------------------
+
+    def fake_gemini(self, path, body, rng):
+        prompt = " ".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = self.reply_text(rng)
+        config = body.get("generationConfig") or body.get("generation_config") or {}
+        if (config.get("responseMimeType") or config.get("response_mime_type")) == "application/json":
+            schema = config.get("responseSchema") or config.get("response_schema")
+            if schema:
+                value = fake_value(schema, {}, "", text, rng)
+            else:
+                # no schema sent, fill in the keys the prompt asks for ("summary": ..., "mood": ...)
+                value = {key: fake_value({}, {}, key, text, rng) for key in dict.fromkeys(re.findall(r'"(\w+)":', prompt))}
+            text = json.dumps(value)
+        time.sleep(self.fake.token_s * len(stream_pieces(text)))
+        self.send_json(200, {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+                "safetyRatings": [],
+            }],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (len(prompt) + len(text)) // 4,
+            },
+        })
+
+    # -- Pinecone -------------------------------------------------------------
+
+    def fake_pinecone(self, path, body, rng):
+        fake = self.fake
+        namespace_name = body.get("namespace", "")
+        with fake.lock:
+            namespace = fake.index.setdefault(namespace_name, {})
+            if path == "/vectors/upsert":
+                for vector in body.get("vectors", []):
+                    namespace[vector["id"]] = (np.asarray(vector["values"], dtype=np.float32), vector.get("metadata", {}))
+                result = {"upsertedCount": len(body.get("vectors", []))}
+            elif path == "/vectors/delete":
+                if body.get("deleteAll"):
+                    namespace.clear()
+                for _id in body.get("ids", []):
+                    namespace.pop(_id, None)
+                result = {}
+            elif path == "/describe_index_stats":
+                result = {
+                    "namespaces": {name: {"vectorCount": len(ns)} for name, ns in fake.index.items()},
+                    "dimension": EMBEDDING_DIMENSIONS,
+                    "indexFullness": 0.0,
+                    "totalVectorCount": sum(len(ns) for ns in fake.index.values()),
+                }
+            else:
+                result = None
+                entries = list(namespace.items())
+        if result is not None:
+            self.send_json(200, result)
+            return
+        query = np.asarray(body.get("vector", []), dtype=np.float32)
+        matches = []
+        if entries and len(query):
+            vectors = np.stack([vector for _, (vector, _) in entries])
+            norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query) or 1.0)
+            scores = vectors @ query / np.where(norms == 0, 1.0, norms)
+            for i in np.argsort(-scores)[:body.get("topK", 10)]:
+                _id, (vector, metadata) = entries[i]
+                match = {"id": _id, "score": float(scores[i]), "values": []}
+                if body.get("includeValues"):
+                    match["values"] = vector.tolist()
+                if body.get("includeMetadata"):
+                    match["metadata"] = metadata
+                matches.append(match)
+        self.send_json(200, {"matches": matches, "namespace": namespace_name, "usage": {"readUnits": 5}})
+
+    # -- record / replay ------------------------------------------------------
+
+    def record(self, provider, route, key, raw):
+        fake = self.fake
+        upstream = fake.upstreams.get(provider)
+        if not upstream:
+            self.send_json(502, {"error": {"message": f"fake providers: no --{provider}-upstream to record from"}})
+            return
+        headers = {
+            name: value for name, value in self.headers.items()
+            if name.lower() not in ("host", "content-length", "accept-encoding", "connection")
+        }
+        started = time.perf_counter()
+        response = fake.session.request(self.command, upstream.rstrip("/") + self.path, data=raw, headers=headers)
+        elapsed = time.perf_counter() - started
+        content_type = response.headers.get("Content-Type", "application/octet-stream")
+        entry = {
+            "key": key,
+            "method": self.command,
+            "path": urlsplit(self.path).path,
+            "status": response.status_code,
+            "content_type": content_type,
+            "elapsed_ms": round(elapsed * 1000, 1),
+        }
+        if content_type.startswith("text/event-stream"):
+            entry["events"] = [event + "\n\n" for event in response.text.split("\n\n") if event.strip()]
+        else:
+            entry["body_b64"] = base64.b64encode(response.content).decode()
+        fake.cassette.add(entry)
+        fake.count(route, "recorded")
+        self.replay(entry, route, None)
+
+    def replay(self, entry, route, rng):
+        # with an rng the configured latency is used, otherwise the response goes out as is
+        if rng is not None:
+            time.sleep(self.fake.latency[route](rng))
+        if "events" in entry:
+            self.send_chunks(entry["status"], entry["events"], entry["content_type"], self.fake.token_s if rng else 0)
+        else:
+            self.send_bytes(entry["status"], base64.b64decode(entry["body_b64"]), entry["content_type"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="offline stand-in for the OpenAI, Gemini and Pinecone APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--mode", choices=["fake", "record", "replay"], default="fake")
+    parser.add_argument("--cassette", default="cassettes/providers.jsonl")
+    parser.add_argument("--on-miss", choices=["error", "fake"], default="error")
+    parser.add_argument("--latency", action="append", default=[], help="route=distribution, e.g. chat=fixed:200")
+    parser.add_argument("--token-ms", type=float, default=20, help="delay per streamed chunk")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", default="0")
+    parser.add_argument("--pinecone-seed", default="people.txt")
+    parser.add_argument("--openai-upstream", default="https://api.openai.com")
+    parser.add_argument("--gemini-upstream", default="https://generativelanguage.googleapis.com")
+    parser.add_argument("--pinecone-upstream", default=os.getenv("PINECONE_UPSTREAM_HOST"))
+    args = parser.parse_args(argv)
+
+    Handler.fake = FakeProviders(args)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"Fake providers ({args.mode}) listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
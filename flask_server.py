@@ -1,6 +1,11 @@
+import io
 import json
 import base64
+import binascii
 import time
+import mimetypes
+import uuid
+import multiprocessing
 from dotenv import load_dotenv
 import os
 from flask import Flask, request, jsonify
@@ -21,39 +26,124 @@ from mongo_functions import (
     get_goals,
     add_goal,
     update_goal,
+    create_indexes,
+    resume_enrichment,
 )
 from datetime import datetime
 import time
 from mongo_functions import get_timeline, add_conversation, add_notes, add_connection
 from pydantic import BaseModel
 import base64
-import openai
-import whisper
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context, g
 from flask_cors import CORS
 import json
 import os
 from pymongo import MongoClient
 from datetime import datetime
 from dotenv import load_dotenv
-from recc import answer
-from magic import nike, get_messages, reset
+from recc import answer, answer_stream, semantic_cache as recc_semantic_cache
+from magic import nike, nike_stream, new_messages as new_magic_messages
+from recc import new_messages as new_recc_messages
+from history import TokenBudgetHistory
+from session_store import create_session_store, SessionConflict, SESSION_TTL
+from streaming import sse, wants_stream, field_deltas, timed, record_ttfb, ttfb_stats
+import model_registry
+from transcription_service import create_transcription_service, QueueFull, WHISPER_DEFAULT_MODEL, WHISPER_MODELS
+from stream_transcriber import StreamRegistry
+from hotlines import HotlineIndex
+from crisis import CrisisDetector, CRISIS_MESSAGE
+from llm_cache import cache as llm_cache
+import llm_client
 load_dotenv()
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
-openAIclient = openai.OpenAI()
-
 client_mongo = MongoClient("mongodb://localhost:27017/")
 db = client_mongo["main_db"]
 user_info = db["user_info"]
 user_data = db["user_data"]
 
-whisper_model = whisper.load_model("tiny")
+# whisper runs in its own worker processes, the registry just starts the pool
+model_registry.register("whisper", create_transcription_service)
+
+# the whisper workers start without this file (see TranscriptionService.start_workers),
+# this guard only keeps any other spawned child from redoing the startup work
+if multiprocessing.parent_process() is None:
+    create_indexes()
+    resume_enrichment()
+    model_registry.preload()
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "X-Session-Id"], supports_credentials=True)
+
+def new_session():
+    # what used to be the `ms` global here and the `messages` globals of recc and magic
+    return {
+        "recommend": [],
+        "recc": {"messages": new_recc_messages(), "history": {}},
+        "magic": {"messages": new_magic_messages(), "history": {}},
+    }
 
-ms = []
+sessions = create_session_store(new_session)
+SESSION_COOKIE = "session_id"
+
+def get_session_id():
+    '''
+    X-Session-Id header, then session_id/user_id from the body, form or query string,
+    then the session_id cookie. a request with none of them gets a new id, sent back
+    as the X-Session-Id header and the cookie so the next request continues it
+    '''
+    if "session_id" in g:
+        return g.session_id
+    data = request.get_json(silent=True) or {}
+    for value in (
+        request.headers.get("X-Session-Id"),
+        data.get("session_id"),
+        request.form.get("session_id"),
+        request.args.get("session_id"),
+        data.get("user_id"),
+        request.form.get("user_id"),
+        request.args.get("user_id"),
+        request.cookies.get(SESSION_COOKIE),
+    ):
+        if value not in (None, ""):
+            g.session_id = str(value)
+            return g.session_id
+    g.session_id = g.minted_session_id = uuid.uuid4().hex
+    return g.session_id
+
+@app.after_request
+def send_minted_session_id(response):
+    if g.get("minted_session_id"):
+        response.headers["X-Session-Id"] = g.minted_session_id
+        response.set_cookie(SESSION_COOKIE, g.minted_session_id, max_age=SESSION_TTL, httponly=True, samesite="Lax")
+    return response
+
+def session_part(session, path):
+    for key in path:
+        session = session[key]
+    return session
+
+def message_counts(session, *paths):
+    return {path: len(session_part(session, path)) for path in paths}
+
+def save_turns(session_id, session, counts, history_key, history):
+    '''
+    saves what this request appended to the lists in `counts` (taken when it loaded
+    `session`) and its history on top of the stored session, so turns from
+    concurrent requests on the same session are kept instead of the last write
+    winning. returns the stored session
+    '''
+    added = {path: session_part(session, path)[count:] for path, count in counts.items()}
+
+    def apply(stored):
+        for path, items in added.items():
+            session_part(stored, path).extend(items)
+        stored[history_key]["history"] = history.to_dict()
+    return sessions.update(session_id, apply)
+
+def load_history(state):
+    history = TokenBudgetHistory()
+    history.load(state["history"])
+    return history
 
 class EmergencyResponse(BaseModel):
     message: str
@@ -95,8 +185,6 @@ def get_user(user_id):
     user_id = int(user_id)
     user = user_info.find_one({"_id": ObjectId(user_id)})
     if user:
-        print("USER KEYS")
-        print(user)
         user["user_id"] = json.loads(json_util.dumps(user["_id"]))
         return jsonify(user), 200
     return jsonify({"message": "User not found"}), 404
@@ -141,19 +229,75 @@ def add_conversation_api():
     data = request.json
     data["user_id"] = int(data["user_id"])
     user_id = data["user_id"]
-    conversation = get_messages()
+    session_id = get_session_id()
+    conversation = sessions.get(session_id)["magic"]["messages"]
     conversation_with = 'bot_conversation'  # Can be None for bot conversations
     conversation_type = 'bot_conversation'  # 'bot_conversation' or 'connection_conversation'
     
-    add_conversation(user_id, conversation, conversation_with, conversation_type)
-    return jsonify({"message": "Conversation added successfully"}), 201
+    conversation_id = add_conversation(user_id, conversation, conversation_with, conversation_type)
+    return jsonify({"message": "Conversation accepted", "conversation_id": str(conversation_id), "enrichment_status": "pending"}), 202
 
 @app.route('/api/notes', methods=['POST'])
 def add_notes_api():
     data = request.json
     data["user_id"] = int(data["user_id"])
-    add_notes(data["user_id"], data["content"])
-    return jsonify({"message": "Notes added successfully"}), 201
+    notes_id = add_notes(data["user_id"], data["content"])
+    return jsonify({"message": "Notes accepted", "notes_id": str(notes_id), "enrichment_status": "pending"}), 202
+
+@app.route('/warmup', methods=['POST'])
+def warmup():
+    data = request.get_json(silent=True) or {}
+    try:
+        load_times = model_registry.warmup(data.get("models"))
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"load_times": load_times, "models": model_registry.status()}), 200
+
+@app.route('/models', methods=['GET'])
+def models_status():
+    return jsonify(model_registry.status()), 200
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    stats = {"llm": llm_cache.metrics()}
+    if recc_semantic_cache is not None:
+        stats["recommend_semantic"] = recc_semantic_cache.metrics()
+    if model_registry.is_loaded("people_vectorstore"):
+        stats["embeddings"] = model_registry.get("people_vectorstore").embeddings.metrics()
+    return jsonify(stats), 200
+
+@app.route('/metrics/transcription', methods=['GET'])
+def transcription_metrics():
+    if not model_registry.is_loaded("whisper"):
+        return jsonify({"loaded": False}), 200
+    return jsonify(model_registry.get("whisper").metrics()), 200
+
+@app.route('/metrics/ttfb', methods=['GET'])
+def ttfb_metrics():
+    return jsonify(ttfb_stats()), 200
+
+@app.route('/metrics/llm', methods=['GET'])
+def llm_metrics():
+    return jsonify(llm_client.metrics()), 200
+
+class InvalidUpload(ValueError):
+    '''
+    the request's audio can't be read at all (not the audio itself being undecodable)
+    '''
+
+@app.errorhandler(InvalidUpload)
+def invalid_upload(e):
+    app.logger.error(f"Invalid upload: {e}")
+    return jsonify({"error": str(e)}), 400
+
+@app.errorhandler(SessionConflict)
+def session_conflict(e):
+    return jsonify({"error": str(e)}), 409
+
+@app.errorhandler(llm_client.ProviderUnavailable)
+def provider_unavailable(e):
+    # a busy or failing model provider, the client can try again shortly
+    return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
 
 @app.route('/test', methods=['GET'])
 def test():
@@ -162,13 +306,28 @@ def test():
 @app.route('/api/timeline/<user_id>', methods=['GET'])
 def get_timeline_api(user_id):
     user_id = int(user_id)
-    timeline = get_timeline(user_id)
-    print("TIMELINE KEYS")
+    try:
+        timeline, next_cursor, prev_cursor = get_timeline(
+            user_id,
+            limit=request.args.get("limit", type=int),
+            before=request.args.get("before"),
+            after=request.args.get("after"),
+            item_type=request.args.get("type"),
+            compact=request.args.get("compact", "false").lower() in ("1", "true"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     recursive_objectid_destroyer(timeline)
     for item in timeline:
         item['_id'] = str(item['_id'])
 
-    return jsonify(timeline), 200
+    # body stays a plain list for the existing clients, cursors ride in headers
+    response = jsonify(timeline)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if prev_cursor:
+        response.headers["X-Prev-Cursor"] = prev_cursor
+    return response, 200
 
 # Prescriptions Endpoints
 
@@ -268,48 +427,21 @@ def complete_goal_api(goal_id):
 
 #--------------------------------------------------------------
 
-# Load phone numbers from JSON
-with open('scraped_data.json', 'r') as f:
-    phone_numbers = json.load(f)
-
-@app.route('/process_audio', methods=['POST'])
-def process_audio():
-    print("Endpoint process audio started")
-    # Get the encrypted audio data from the request
-    encrypted_audio = request.json.get('audio')
-    
-    # Decrypt the audio (assuming it's base64 encoded)
-    audio_data = base64.b64decode(encrypted_audio)
-    # Assuming the audio data is in a file, save the audio data to a temporary file
-    with open("temp_audio.wav", "wb") as f:
-        f.write(audio_data)
-
-    # Transcribe the audio using Whisper
-    result = whisper_model.transcribe("temp_audio.wav")
-
-    # Extract the transcribed text
-    transcription = result["text"]
-    print("Transcription: ", transcription)
-    # Send the transcription to OpenAI for processing
+# Load phone numbers from JSON once, each prompt only gets the relevant categories
+hotline_index = HotlineIndex('scraped_data.json')
+crisis_detector = CrisisDetector(hotline_index)
 
+def emergency_messages(text):
     # sample_text = "I'm feeling really down and and I just cut myself out of hate. I need help."
     system_prompt = f'''You are an AI assistant who returns a brief consoling message to help the user and, only if needed provides a relevant phone number with the name of a hotline. 
-    The only numbers you can use are these: {json.dumps(phone_numbers)}'''
-    
-    completion = openAIclient.beta.chat.completions.parse(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": transcription}
-        ],
-        response_format = EmergencyResponse
-    )
-    
-    # Extract the response from OpenAI
-    ai_response = completion.choices[0].message.parsed
-    print("Message :", ai_response.message)
-    print("Phone number: ", ai_response.phone)
-    print("Name: ", ai_response.name)
+    The only numbers you can use are these: {json.dumps(hotline_index.relevant(text))}'''
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": text}
+    ]
+
+def emergency_result(ai_response):
+    app.logger.debug(f"Emergency response: {ai_response.message!r}, phone {ai_response.phone!r}, name {ai_response.name!r}")
     response = {}
     if(ai_response.phone != "0" and ai_response.name != ""):
         response["text"] = ai_response.message
@@ -317,127 +449,260 @@ def process_audio():
         response["name"] = ai_response.name
     else:
         response["text"] = ai_response.message
+    return response
+
+def crisis_result(hit):
+    app.logger.info("Crisis fast path: %s %r", hit["category"], hit["term"])
+    return {
+        "text": CRISIS_MESSAGE.format(name=hit["name"], phone=hit["phone"]),
+        "phone": hit["phone"],
+        "name": hit["name"],
+        "fast_path": True,
+    }
+
+def emergency_response(text):
+    '''
+    clear risk signals get the hotline straight from the local matcher with a fixed
+    consoling message, without waiting on the model. everything else goes through
+    gpt-4o-mini. streamed calls get the model's message after the hotline event
+    '''
+    hit = crisis_detector.check(text)
+    if hit:
+        return crisis_result(hit)
+    completion = llm_client.parse("gpt-4o-mini", emergency_messages(text), EmergencyResponse)
+    return emergency_result(completion.choices[0].message.parsed)
+
+def read_audio_upload():
+    '''
+    returns (filename, bytes) for a multipart "audio" file, a raw binary body
+    (audio/* or application/octet-stream) or the old JSON {"audio": <base64>} body.
+    everything stays in memory so concurrent requests can't clobber each other
+    '''
+    if 'audio' in request.files:
+        audio_file = request.files['audio']
+        if audio_file.filename == '':
+            # the form was sent without picking a file
+            raise InvalidUpload("No selected file")
+        return audio_file.filename or "audio.mp3", audio_file.read()
+    if request.is_json:
+        encrypted_audio = (request.get_json(silent=True) or {}).get('audio')
+        if not encrypted_audio:
+            return None, b""
+        # Decrypt the audio (assuming it's base64 encoded)
+        try:
+            return "audio.wav", base64.b64decode(encrypted_audio, validate=True)
+        except (binascii.Error, TypeError, ValueError) as e:
+            raise InvalidUpload(f"audio is not valid base64: {e}")
+    extension = mimetypes.guess_extension(request.mimetype or "") or ".mp3"
+    if extension in (".bin", ".a"):
+        extension = ".mp3"
+    return "audio" + extension, request.get_data()
+
+@app.route('/process_audio', methods=['POST'])
+def process_audio():
+    app.logger.info("Endpoint process audio started")
+    filename, audio_data = read_audio_upload()
+    if not audio_data:
+        return jsonify({"error": "No audio provided"}), 400
+
+    # Transcribe the audio using Whisper, straight from memory. it's decoded once a
+    # whisper slot is free, undecodable uploads raise AudioDecodeError (a ValueError)
+    try:
+        transcription = model_registry.get("whisper").transcribe_upload(
+            audio_data,
+            request.args.get("model", WHISPER_DEFAULT_MODEL),
+        )
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "2"}
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    app.logger.debug(f"Transcription: {transcription}")
+    # Send the transcription to OpenAI for processing
+    if wants_stream(request):
+        return Response(stream_with_context(process_text_events(transcription, {"transcription": transcription})), mimetype="text/event-stream")
+
+    response = emergency_response(transcription)
+    response["transcription"] = transcription
+    return jsonify(response), 200
+
+transcription_streams = StreamRegistry()
+
+@app.route('/transcribe/stream', methods=['POST'])
+def start_transcription_stream():
+    '''
+    starts a chunked upload, chunks are raw 16-bit mono PCM at ?sample_rate= (default 16000)
+    '''
+    model_size = request.args.get("model", WHISPER_DEFAULT_MODEL)
+    if model_size not in WHISPER_MODELS:
+        return jsonify({"error": f"Unknown whisper model {model_size!r}"}), 400
+    stream = transcription_streams.create(
+        model_registry.get("whisper"),
+        model_size,
+        request.args.get("sample_rate", 16000, type=int),
+    )
+    return jsonify({"stream_id": stream.id}), 201
+
+@app.route('/transcribe/stream/<stream_id>/chunk', methods=['POST'])
+def transcription_stream_chunk(stream_id):
+    stream = transcription_streams.get(stream_id)
+    if stream is None:
+        return jsonify({"error": "Unknown or expired stream"}), 404
+    try:
+        return jsonify(stream.add_chunk(request.get_data())), 200
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "2"}
+
+@app.route('/transcribe/stream/<stream_id>/finish', methods=['POST'])
+def finish_transcription_stream(stream_id):
+    '''
+    transcribes whatever is left after the last pause and returns the full text.
+    ?respond=emergency also runs the /process_text step on it in the same request
+    '''
+    stream = transcription_streams.get(stream_id)
+    if stream is None:
+        return jsonify({"error": "Unknown or expired stream"}), 404
+    try:
+        transcription = stream.finish()
+    except QueueFull as e:
+        # the stream stays registered, so the client can retry finish
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "2"}
+    transcription_streams.pop(stream_id)
+    app.logger.debug(f"Transcription: {transcription}")
+    response = {"transcription": transcription}
+    if request.args.get("respond") == "emergency":
+        response.update(emergency_response(transcription))
     return jsonify(response), 200
 
 @app.route('/process_text', methods=['POST'])
 def process_text():
-    print("Endpoint process text started")
-    # Get the encrypted audio data from the request
+    started = time.perf_counter()
+    app.logger.info("Endpoint process text started")
     input_text= request.json.get('text')
+    app.logger.debug(f"Transcription: {input_text}")
 
-    # # Extract the transcribed text
-    print("Transcription: ", input_text)
-    # # Send the transcription to OpenAI for processing
-    # openai.api_key = os.getenv("OPENAI_API_KEY")
+    if wants_stream(request):
+        return Response(stream_with_context(timed("/process_text", process_text_events(input_text), started)), mimetype="text/event-stream")
 
-   # sample_text = "I'm feeling really down and and I just cut myself out of hate. I need help."
-    system_prompt = f'''You are an AI assistant who returns a brief consoling message to help the user and, only if needed provides a relevant phone number with the name of a hotline. 
-    The only numbers you can use are these: {json.dumps(phone_numbers)}'''
-    
-    completion = openAIclient.beta.chat.completions.parse(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": input_text}
-        ],
-        response_format = EmergencyResponse
-    )
-    
-    # Extract the response from OpenAI
-    ai_response = completion.choices[0].message.parsed
-    print("Message :", ai_response.message)
-    print("Phone number: ", ai_response.phone)
-    print("Name: ", ai_response.name)
-    response = {}
-    if(ai_response.phone != "0" and ai_response.name != ""):
-        response["text"] = ai_response.message
-        response["phone"] = ai_response.phone
-        response["name"] = ai_response.name
-    else:
-        response["text"] = ai_response.message
+    response = emergency_response(input_text)
+    record_ttfb("/process_text", "fast" if response.get("fast_path") else "blocking", time.perf_counter() - started)
     return jsonify(response), 200
 
+def process_text_events(input_text, extra=None):
+    '''
+    SSE: "delta" events with the consoling message as it's written, then "final"
+    with the same body the non-streaming endpoint returns (text, phone, name).
+    on a local crisis match a "hotline" event (phone, name) goes out first, before
+    the LLM is even called, and the final event keeps that hotline
+    '''
+    hit = crisis_detector.check(input_text)
+    if hit:
+        app.logger.info("Crisis fast path: %s %r", hit["category"], hit["term"])
+        yield sse("hotline", {"phone": hit["phone"], "name": hit["name"], **(extra or {})})
+    with llm_client.parse_stream("gpt-4o-mini", emergency_messages(input_text), EmergencyResponse) as stream:
+        for text in field_deltas(stream, "message"):
+            yield sse("delta", {"text": text})
+        ai_response = stream.get_final_completion().choices[0].message.parsed
+    response = emergency_result(ai_response)
+    if hit:
+        response.update(phone=hit["phone"], name=hit["name"], fast_path=True)
+    response.update(extra or {})
+    yield sse("final", response)
+
 @app.route('/reset', methods=['POST'])
 def reset_conversation():
-    global ms
-    ms = []
+    def reset(session):
+        fresh = new_session()
+        session["recommend"] = fresh["recommend"]
+        session["recc"] = fresh["recc"]
+    sessions.update(get_session_id(), reset)
     return jsonify({"message": "Conversation reset successfully"}), 200
 
-def cleanup_old_files():
-    files_to_delete = ['input.mp3', 'speech.mp3']
-    for file in files_to_delete:
-        if os.path.exists(file):
-            try:
-                os.remove(file)
-                app.logger.info(f"Deleted old file: {file}")
-            except Exception as e:
-                app.logger.error(f"Failed to delete {file}: {str(e)}")
-
-# Call cleanup function when the app starts
-
 @app.route('/update', methods=['POST'])
 def update():
-    data = request.get_json()
-    messages = get_messages
-    reset()
+    def reset(session):
+        session["magic"] = new_session()["magic"]
+    sessions.update(get_session_id(), reset)
     
     return {"message": "success"}
 
 @app.route('/process_nsp', methods=['POST'])
 def process_nsp():
-    cleanup_old_files()
-    if 'audio' not in request.files:
-        app.logger.error("No audio file in request")
+    started = time.perf_counter()
+    filename, audio_data = read_audio_upload()
+    if not audio_data:
+        app.logger.error("No audio in request")
         return {"error": "No audio file provided"}, 400
-
-    audio_file = request.files['audio']
-    
-    if audio_file.filename == '':
-        app.logger.error("No selected file")
-        return {"error": "No selected file"}, 400
-
-    input_path = 'input.mp3'
-    output_path = 'speech.mp3'
+    app.logger.info(f"Input audio size: {len(audio_data)} bytes")
     
     try:
-        # Save the uploaded file
-        audio_file.save(input_path)
-        app.logger.info(f"Audio file saved to {input_path}")
-        
-        # Check if the file was actually saved and has content
-        if not os.path.exists(input_path) or os.path.getsize(input_path) == 0:
-            app.logger.error(f"Failed to save audio file or file is empty: {input_path}")
-            return {"error": "Failed to save audio file or file is empty"}, 500
-
-        # Log file details
-        app.logger.info(f"Input file size: {os.path.getsize(input_path)} bytes")
-        
         # Call nike function (make sure this function is defined)
-        nike()
+        session_id = get_session_id()
+        session = sessions.get(session_id)
+        counts = message_counts(session, ("magic", "messages"))
+        history = load_history(session["magic"])
+
+        if wants_stream(request):
+            # mp3 chunks go out sentence by sentence while the answer is still being written
+            return Response(
+                stream_with_context(timed("/process_nsp", process_nsp_chunks(session_id, session, counts, history, (filename, audio_data)), started)),
+                mimetype="audio/mpeg",
+            )
+
+        speech = nike(session["magic"]["messages"], history, (filename, audio_data))
+        save_turns(session_id, session, counts, "magic", history)
         app.logger.info("nike() function called")
+        app.logger.info(f"Output audio size: {len(speech)} bytes")
         
-        if not os.path.exists(output_path):
-            app.logger.error(f"Failed to generate {output_path}")
-            return {"error": f"Failed to generate {output_path}"}, 500
-        
-        app.logger.info(f"Output file size: {os.path.getsize(output_path)} bytes")
-        
-        return send_file(output_path, mimetype="audio/mpeg", as_attachment=True, download_name="speech.mp3")
+        record_ttfb("/process_nsp", "blocking", time.perf_counter() - started)
+        return send_file(io.BytesIO(speech), mimetype="audio/mpeg", as_attachment=True, download_name="speech.mp3")
     
     except Exception as e:
         app.logger.error(f"An error occurred: {str(e)}", exc_info=True)
         return {"error": f"An error occurred: {str(e)}"}, 500
+
+def process_nsp_chunks(session_id, session, counts, history, audio):
+    for chunk in nike_stream(session["magic"]["messages"], history, audio):
+        yield chunk
+    save_turns(session_id, session, counts, "magic", history)
     
 @app.route('/recommend', methods=['POST'])
 def recommend():
-    global ms
+    started = time.perf_counter()
     data = request.get_json()
     query = data['query']
+    session_id = get_session_id()
+    session = sessions.get(session_id)
+    counts = message_counts(session, ("recommend",), ("recc", "messages"))
+    ms = session["recommend"]
     ms.append({
         'role': 'user',
         'content': query
     })
-    output = answer(query)
+    history = load_history(session["recc"])
+
+    if wants_stream(request):
+        return Response(stream_with_context(timed("/recommend", recommend_events(query, session_id, session, counts, history), started)), mimetype="text/event-stream")
+
+    output = answer(query, session["recc"]["messages"], history)
+    stored = save_recommendation(session_id, session, counts, history, output)
+    record_ttfb("/recommend", "blocking", time.perf_counter() - started)
+    return {"messages": stored["recommend"]}
+
+def recommend_events(query, session_id, session, counts, history):
+    '''
+    SSE: "delta" events with the response text, then "final" with the full
+    message list (including the recommended people) like the non-streaming endpoint
+    '''
+    for kind, value in answer_stream(query, session["recc"]["messages"], history):
+        if kind == "delta":
+            yield sse("delta", {"text": value})
+        else:
+            stored = save_recommendation(session_id, session, counts, history, value)
+            yield sse("final", {"messages": stored["recommend"]})
+
+def save_recommendation(session_id, session, counts, history, output):
+    ms = session["recommend"]
     response = output.response
     ppl = {}
     people = output.people
@@ -451,9 +716,9 @@ def recommend():
         'role': 'assistant',
         'content': {"response": response, "people": ppl}
     })
-    print("------------------------")
-    print(ms)
-    return {"messages": ms}
+    stored = save_turns(session_id, session, counts, "recc", history)
+    app.logger.debug(f"Recommendation messages: {ms}")
+    return stored
 
 @app.route("/process_pdf", methods=["POST"])
 async def process_pdf():
@@ -20,7 +20,7 @@ const ChatBot = React.memo(({ onCreateChat }) => {
   useEffect(() => {
     const resetConversation = async () => {
       try {
-        const response = await fetch('http://localhost:8000/reset', { method: 'POST' });
+        const response = await fetch('http://localhost:8000/reset', { method: 'POST', credentials: 'include' });
         if (!response.ok) throw new Error('Failed to reset conversation');
         console.log('Conversation reset successfully');
         setMessages([]);
@@ -47,6 +47,7 @@ const ChatBot = React.memo(({ onCreateChat }) => {
     try {
       const response = await fetch('http://localhost:8000/recommend', {
         method: 'POST',
+        credentials: 'include',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ query: input }),
       });
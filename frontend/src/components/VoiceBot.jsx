@@ -118,6 +118,7 @@ const VoiceBot = () => {
     try {
       const response = await fetch('http://localhost:8000/process_nsp', {
         method: 'POST',
+        credentials: 'include',
         body: formData,
       });
 
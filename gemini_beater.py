@@ -1,11 +1,26 @@
 import google.generativeai as genai
 from dotenv import load_dotenv
-import os
+import llm_client
+from llm_cache import cache
 
 load_dotenv()
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-flash = genai.GenerativeModel('gemini-1.5-flash')
+FLASH_MODEL = 'gemini-1.5-flash'
 
 def flash_inference(prompt):
-    response = flash.generate_content(prompt)
-    return response.text
\ No newline at end of file
+    return cache.cached_call(FLASH_MODEL, prompt, lambda: llm_client.generate(FLASH_MODEL, prompt).text)
+
+def flash_structured_inference(prompt, schema):
+    '''
+    asks flash for JSON and validates it against the pydantic `schema`,
+    raises pydantic.ValidationError if the model doesn't stick to it
+    '''
+    def generate():
+        response = llm_client.generate(
+            FLASH_MODEL,
+            prompt,
+            generation_config=genai.GenerationConfig(response_mime_type="application/json"),
+        )
+        # validate before caching so a bad answer isn't served again
+        schema.model_validate_json(response.text)
+        return response.text
+    return schema.model_validate_json(cache.cached_call(f"{FLASH_MODEL}:json", prompt, generate))
@@ -0,0 +1,203 @@
+import os
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import llm_client
+
+# max prompt tokens of history (system prompt + summary + recent turns) sent per call
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+HISTORY_SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")
+# the summary prompt asks for <150 words
+SUMMARY_RESERVE_TOKENS = 200
+# hysteresis: turns are only folded into the summary once the window is this far over
+# budget, and then down to HISTORY_LOW_WATER of the budget, so a summary call happens
+# every several turns instead of on every turn past the budget
+HISTORY_SUMMARY_MARGIN = float(os.getenv("HISTORY_SUMMARY_MARGIN", "0.25"))
+HISTORY_LOW_WATER = float(os.getenv("HISTORY_LOW_WATER", "0.6"))
+# summarize off the request path and keep sending the previous summary until it's ready.
+# a window this many budgets large waits for the pending summary instead
+HISTORY_SUMMARY_ASYNC = os.getenv("HISTORY_SUMMARY_ASYNC", "1") == "1"
+HISTORY_HARD_LIMIT = float(os.getenv("HISTORY_HARD_LIMIT", "2"))
+HISTORY_SUMMARY_WORKERS = int(os.getenv("HISTORY_SUMMARY_WORKERS", "2"))
+# finished summaries nobody came back for are dropped past this many
+MAX_PENDING_SUMMARIES = 1000
+
+logger = logging.getLogger(__name__)
+encoding = None
+summary_pool = ThreadPoolExecutor(max_workers=HISTORY_SUMMARY_WORKERS, thread_name_prefix="history-summary")
+# job id -> future of the new summary. the id is kept in the session's history state,
+# a worker that doesn't have the job (restart, another process) just starts a new one
+pending_summaries = OrderedDict()
+pending_lock = threading.Lock()
+
+
+def count_tokens(text):
+    global encoding
+    if encoding is None:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model("gpt-4o")
+    return len(encoding.encode(text))
+
+
+def message_tokens(message):
+    # ~4 tokens of per-message overhead in the chat format
+    return count_tokens(str(message["content"])) + 4
+
+
+def summarize_turns(summary, turns):
+    '''
+    folds `turns` into the running summary with a cheap model
+    '''
+    transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+    prompt = f"""Update the summary of this conversation between a user and a mental health assistant.
+    Keep what matters for continuing the conversation: the user's situation, feelings, anything they shared about medication, activities or people, and advice already given.
+    Keep it under 150 words.
+
+    Current summary:
+    {summary or "(none)"}
+
+    New turns:
+    {transcript}
+    """
+    response = llm_client.chat(HISTORY_SUMMARY_MODEL, [{"role": "user", "content": prompt}])
+    return response.choices[0].message.content.strip()
+
+
+def submit_summary(summary, turns):
+    job = uuid.uuid4().hex
+    with pending_lock:
+        pending_summaries[job] = summary_pool.submit(summarize_turns, summary, turns)
+        while len(pending_summaries) > MAX_PENDING_SUMMARIES:
+            pending_summaries.popitem(last=False)
+    return job
+
+
+def pending_summary(job):
+    with pending_lock:
+        return pending_summaries.get(job)
+
+
+def drop_summary(job):
+    with pending_lock:
+        pending_summaries.pop(job, None)
+
+
+class TokenBudgetHistory:
+    '''
+    builds the message list for each call: the system prompt, a rolling summary of
+    older turns and the recent turns, within `budget` tokens give or take the
+    summary margin. the full message list is left untouched so it can still be
+    stored as the conversation
+    '''
+
+    def __init__(self, budget=HISTORY_TOKEN_BUDGET, margin=HISTORY_SUMMARY_MARGIN, low_water=HISTORY_LOW_WATER, background=HISTORY_SUMMARY_ASYNC):
+        self.budget = budget
+        self.margin = margin
+        self.low_water = low_water
+        self.background = background
+        self.summary = ""
+        self.summarized = 0
+        # the summary being written in the background and the turn count it covers
+        self.job = None
+        self.job_upto = 0
+        self.last_stats = {}
+
+    def reset(self):
+        if self.job:
+            drop_summary(self.job)
+        self.summary = ""
+        self.summarized = 0
+        self.job = None
+        self.job_upto = 0
+
+    def to_dict(self):
+        return {"summary": self.summary, "summarized": self.summarized, "job": self.job, "job_upto": self.job_upto}
+
+    def load(self, state):
+        self.summary = state.get("summary", "")
+        self.summarized = state.get("summarized", 0)
+        self.job = state.get("job")
+        self.job_upto = state.get("job_upto", 0)
+
+    def collect(self, wait=False):
+        '''
+        takes the background summary once it's done (or right away with `wait`).
+        a failed or lost job is forgotten, the next window starts another
+        '''
+        if not self.job:
+            return
+        future = pending_summary(self.job)
+        if future is not None and not future.done() and not wait:
+            return
+        if future is not None:
+            try:
+                self.summary = future.result()
+                self.summarized = self.job_upto
+            except Exception as e:
+                logger.warning(f"History summary failed, keeping the previous one: {e}")
+            drop_summary(self.job)
+        self.job = None
+        self.job_upto = 0
+
+    def fold_until(self, turns, budget):
+        '''
+        index of the first turn to keep so the kept turns fit in `budget`, always
+        keeping the latest one, never before what's summarized already
+        '''
+        keep_from = len(turns)
+        used = 0
+        for i in range(len(turns) - 1, self.summarized - 1, -1):
+            tokens = message_tokens(turns[i])
+            if used + tokens > budget and keep_from < len(turns):
+                break
+            used += tokens
+            keep_from = i
+        return keep_from
+
+    def window(self, messages):
+        if messages and messages[0]["role"] == "system":
+            system, turns = [messages[0]], messages[1:]
+        else:
+            system, turns = [], messages
+        if max(self.summarized, self.job_upto) > len(turns):
+            # the message list was reset underneath us
+            self.reset()
+        self.collect()
+
+        remaining = self.budget - sum(message_tokens(m) for m in system)
+        if self.summary or self.job or sum(message_tokens(m) for m in turns[self.summarized:]) > remaining:
+            # leave room for the summary we already have or are about to write
+            remaining -= max(count_tokens(self.summary), SUMMARY_RESERVE_TOKENS) + 12
+        unsummarized = sum(message_tokens(m) for m in turns[self.summarized:])
+
+        if self.job and unsummarized > remaining * HISTORY_HARD_LIMIT:
+            # the summary is falling behind, wait for it rather than send all of this
+            self.collect(wait=True)
+            unsummarized = sum(message_tokens(m) for m in turns[self.summarized:])
+
+        if not self.job and unsummarized > remaining * (1 + self.margin):
+            keep_from = self.fold_until(turns, remaining * self.low_water)
+            if keep_from > self.summarized:
+                if self.background:
+                    self.job = submit_summary(self.summary, turns[self.summarized:keep_from])
+                    self.job_upto = keep_from
+                else:
+                    self.summary = summarize_turns(self.summary, turns[self.summarized:keep_from])
+                    self.summarized = keep_from
+
+        window = list(system)
+        if self.summary:
+            window.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+        window.extend(turns[self.summarized:])
+
+        self.last_stats = {
+            "total_messages": len(messages),
+            "window_messages": len(window),
+            "summarized_turns": self.summarized,
+            "summary_pending": bool(self.job),
+            "window_tokens": sum(message_tokens(m) for m in window),
+        }
+        logger.debug(f"History: {self.last_stats}")
+        return window
@@ -0,0 +1,100 @@
+import re
+import json
+
+URGENT = "Serious and Urgent"
+# general crisis lines, always in the prompt next to "Serious and Urgent" since a
+# message about pain or weight can still be a suicidal one
+FALLBACK = ["Crisis #s (Any Age)", "Suicide"]
+# keyword-matched categories put in the prompt besides those
+MAX_CATEGORIES = 3
+
+# hand-picked triggers per category, matched as whole words. a trailing * makes it a
+# word prefix ("suicid*" matches suicidal), only for stems that can't be mistaken,
+# "sin" or "meth" would also match "single" and "method"
+KEYWORDS = {
+    "Abortion": ["abortion*", "aborted", "terminate pregnancy", "terminated my pregnancy"],
+    "Abuse": ["abuse", "abused", "assault*", "raped", "rape", "molest*", "hits me", "beats me", "hurting me", "touched me"],
+    "Addiction": ["addict*", "alcohol*", "drunk", "drinking", "drugs", "cocaine", "heroin", "meth", "weed", "marijuana", "opioid*", "relapse*", "overdos*", "sober"],
+    "Cancer": ["cancer", "tumor*", "tumour*", "chemo*", "oncolog*", "leukemia"],
+    "Care Givers": ["caregiver*", "caring for my", "take care of my", "elderly", "dementia", "alzheimer*"],
+    "Christian Counseling": ["christian*", "church", "pray", "praying", "prayer*", "god", "faith", "pastor"],
+    "Chronic Illness/Pain": ["chronic", "pain", "painful", "illness*", "disabilit*", "fibromyalgia", "sick all the time"],
+    "Crisis #s (Teens Under 18)": ["teen", "teens", "teenager*", "high school", "middle school", "my parents", "i'm 1*", "im 1*", "years old"],
+    "Crisis #s (Any Age)": ["crisis", "can't cope", "cant cope", "breaking down", "overwhelm*", "panic*"],
+    "Crisis Pregnancy Helpline": ["pregnan*", "unplanned", "expecting a baby"],
+    "Domestic Violence": ["domestic", "partner hit*", "husband hit*", "boyfriend hit*", "wife hit*", "violent", "violence", "scared of my", "abusive"],
+    "Eating Disorders": ["eating disorder*", "anorexi*", "bulimi*", "binge*", "binging", "purge", "purged", "purging", "starv*", "not eating", "stopped eating", "throw up after", "throwing up", "calories", "weight"],
+    "Family Violence": ["family violence", "my dad hits", "my mom hits", "father hits", "mother hits", "violent family"],
+    "Gambling": ["gambl*", "betting", "casino*", "lottery", "lost all my money"],
+    "Grief/Loss": ["grief", "griev*", "passed away", "died", "death", "funeral*", "loss", "bereave*", "miss her", "miss him"],
+    "Homeless/Shelters": ["homeless*", "shelter*", "evicted", "nowhere to sleep", "nowhere to live", "on the street", "kicked out"],
+    "LGBTQIA+": ["gay", "lesbian*", "bisexual", "trans", "transgender", "queer", "lgbt*", "coming out", "nonbinary", "non-binary", "sexuality"],
+    "Parents": ["my child", "my kid*", "my son", "my daughter", "custody", "missing child", "parenting"],
+    "Poison": ["poison*", "swallowed", "ingested", "took too many", "bleach", "toxic"],
+    "Runaways": ["run away", "ran away", "runaway*", "running away", "left home"],
+    "Salvation": ["jesus", "salvation", "saved", "sin", "sins", "heaven"],
+    "Self-Injury": ["cut myself", "cutting", "self harm*", "self-harm*", "harm myself", "hurt myself", "burn myself", "scratching myself", "self injur*"],
+    "Sexual Addiction": ["porn*", "sex addict*", "sexual addict*", "compulsive sex"],
+    "Suicide": ["suicid*", "kill myself", "end my life", "end it all", "want to die", "better off dead", "no reason to live", "take my life", "don't want to live", "dont want to live", "not be here"],
+}
+
+KEYPAD = {c: str(d) for d, letters in enumerate(["", "", "abc", "def", "ghi", "jkl", "mno", "pqrs", "tuv", "wxyz"]) for c in letters}
+WORD = re.compile(r"[a-z0-9']+")
+
+
+def normalize_number(phone):
+    '''
+    digits only with vanity letters dialed out, e.g. 1-800-799-SAFE -> 18007997233
+    '''
+    return "".join(KEYPAD.get(c, c) for c in phone.lower() if c.isdigit() or c in KEYPAD)
+
+
+def keyword_pattern(keyword):
+    if keyword.endswith("*"):
+        return re.escape(keyword[:-1])
+    return re.escape(keyword) + r"\b"
+
+
+class HotlineIndex:
+    '''
+    scraped_data.json loaded once, with a keyword matcher that picks the categories
+    worth putting in the prompt for a given message
+    '''
+
+    def __init__(self, path="scraped_data.json", max_categories=MAX_CATEGORIES):
+        with open(path) as f:
+            self.directory = json.load(f)
+        self.max_categories = max_categories
+        self.numbers = {}
+        for category, entries in self.directory.items():
+            for name, phone in entries:
+                self.numbers.setdefault(normalize_number(phone), (category, name, phone))
+        # words from the category names themselves also count ("Gambling", "Cancer", ...)
+        self.patterns = {}
+        for category in self.directory:
+            words = set(KEYWORDS.get(category, []))
+            words.update(w for w in WORD.findall(category.lower()) if len(w) > 3 and w not in ("crisis", "under", "ages"))
+            self.patterns[category] = re.compile(r"\b(?:" + "|".join(keyword_pattern(w) for w in sorted(words, key=len, reverse=True)) + r")")
+
+    def classify(self, text):
+        '''
+        relevant categories for `text`: "Serious and Urgent" and the general crisis
+        lines always, then up to max_categories keyword matches, best first
+        '''
+        always = [URGENT] + [category for category in FALLBACK if category in self.directory]
+        text = text.lower()
+        scores = []
+        for category, pattern in self.patterns.items():
+            if category in always:
+                continue
+            hits = len(pattern.findall(text))
+            if hits:
+                scores.append((hits, category))
+        scores.sort(key=lambda s: -s[0])
+        return always + [category for _, category in scores[:self.max_categories]]
+
+    def relevant(self, text):
+        return {category: self.directory[category] for category in self.classify(text)}
+
+    def lookup(self, phone):
+        return self.numbers.get(normalize_number(phone))
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# LLM_CACHE_BACKEND: "memory" (default), "file" or "mongo" for a persistent second tier, "off" to disable
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+LLM_CACHE_MAX_FILES = int(os.getenv("LLM_CACHE_MAX_FILES", "50000"))
+
+
+def cache_key(model, prompt):
+    if not isinstance(prompt, str):
+        prompt = json.dumps(prompt, sort_keys=True, default=str)
+    return hashlib.sha256(f"{model}\0{prompt}".encode()).hexdigest()
+
+
+class MemoryTier:
+    '''
+    LRU with a per-entry expiry
+    '''
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.time() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class FileTier:
+    '''
+    one small JSON file per key under LLM_CACHE_DIR, sharded by the first two hex chars
+    '''
+
+    def __init__(self, directory=LLM_CACHE_DIR, max_files=LLM_CACHE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self.writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        try:
+            with open(self.path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry["expires_at"] < time.time():
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+            return None
+        return entry["value"]
+
+    def set(self, key, value, ttl):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"value": value, "expires_at": time.time() + ttl}, f)
+        os.replace(tmp, path)
+        self.writes += 1
+        # checking the size on every write would mean listing the whole directory
+        if self.writes % 1000 == 0:
+            self.evict()
+
+    def evict(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            files.extend(os.path.join(root, name) for name in names if name.endswith(".json"))
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class MongoTier:
+    '''
+    llm_cache collection, mongo's TTL monitor deletes expired entries
+    '''
+
+    def __init__(self):
+        from pymongo import MongoClient
+        client = MongoClient("mongodb://localhost:27017/")
+        self.collection = client["main_db"]["llm_cache"]
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def get(self, key):
+        from datetime import datetime
+        entry = self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        return entry["value"] if entry else None
+
+    def set(self, key, value, ttl):
+        from datetime import datetime, timedelta
+        self.collection.replace_one(
+            {"_id": key},
+            {"value": value, "expires_at": datetime.utcnow() + timedelta(seconds=ttl)},
+            upsert=True,
+        )
+
+
+class LLMCache:
+    def __init__(self, backend=LLM_CACHE_BACKEND, ttl=LLM_CACHE_TTL):
+        self.enabled = backend != "off"
+        self.ttl = ttl
+        self.memory = MemoryTier()
+        if backend == "file":
+            self.persistent = FileTier()
+        elif backend == "mongo":
+            self.persistent = MongoTier()
+        else:
+            self.persistent = None
+        self.stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0}
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self.count("memory_hits")
+            return value
+        if self.persistent is not None:
+            try:
+                value = self.persistent.get(key)
+            except Exception as e:
+                print(f"LLM cache read failed: {e}")
+                value = None
+            if value is not None:
+                self.count("persistent_hits")
+                self.memory.set(key, value, self.ttl)
+                return value
+        self.count("misses")
+        return None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.memory.set(key, value, ttl)
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, value, ttl)
+            except Exception as e:
+                print(f"LLM cache write failed: {e}")
+
+    def cached_call(self, model, prompt, fn, ttl=None):
+        '''
+        returns fn() for (model, prompt), only calling it on a miss. fn must return
+        something JSON serialisable (usually the response text)
+        '''
+        if not self.enabled:
+            return fn()
+        key = cache_key(model, prompt)
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = fn()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def metrics(self):
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = sum(stats.values())
+        hits = stats["memory_hits"] + stats["persistent_hits"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        return stats
+
+
+cache = LLMCache()
@@ -0,0 +1,320 @@
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+import httpx
+import openai
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+# total time a call may take, waiting for a slot and retries included
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+# how long a request waits for a free slot before it's turned away, so a slow
+# provider backs requests up for seconds instead of holding every flask thread
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "0.5"))
+LLM_MAX_BACKOFF = float(os.getenv("LLM_MAX_BACKOFF", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+# concurrent calls per model, e.g. LLM_CONCURRENCY=gpt-4o=8,tts-1-hd=4, anything else gets the default
+LLM_DEFAULT_CONCURRENCY = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "8"))
+LLM_CONCURRENCY = {
+    name.strip(): int(limit)
+    for name, limit in (
+        item.split("=") for item in os.getenv(
+            "LLM_CONCURRENCY", "gpt-4o=8,gpt-4o-mini=16,whisper-1=4,tts-1-hd=4,gemini-1.5-flash=8,text-embedding-3-small=16"
+        ).split(",") if "=" in item
+    )
+}
+# texts per embeddings request
+LLM_EMBED_BATCH = int(os.getenv("LLM_EMBED_BATCH", "512"))
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+# e.g. http://localhost:8089 for fake_providers.py, Gemini then goes over REST instead of gRPC.
+# OpenAI has its own OPENAI_BASE_URL
+GEMINI_ENDPOINT = os.getenv("GEMINI_ENDPOINT")
+
+
+class ProviderUnavailable(Exception):
+    '''
+    the provider kept failing with transient errors until retries or the deadline ran out
+    '''
+
+
+class Busy(ProviderUnavailable):
+    '''
+    no free slot for the model within LLM_QUEUE_TIMEOUT
+    '''
+
+
+class ModelLimiter:
+    def __init__(self, limit):
+        self.limit = limit
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def count(self, field):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    @contextmanager
+    def slot(self, model, deadline):
+        wait = max(0.0, min(LLM_QUEUE_TIMEOUT, deadline - time.monotonic()))
+        if not self.semaphore.acquire(timeout=wait):
+            self.count("rejected")
+            raise Busy(f"{model} is at its limit of {self.limit} concurrent calls")
+        with self.lock:
+            self.in_flight += 1
+            self.calls += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            self.semaphore.release()
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rejected": self.rejected,
+            }
+
+
+limiters = {}
+clients = {}
+clients_lock = threading.Lock()
+
+
+def limiter_for(model):
+    with clients_lock:
+        if model not in limiters:
+            limiters[model] = ModelLimiter(LLM_CONCURRENCY.get(model, LLM_DEFAULT_CONCURRENCY))
+        return limiters[model]
+
+
+def http_client():
+    '''
+    the pooled httpx client every OpenAI request goes through
+    '''
+    with clients_lock:
+        if "http" not in clients:
+            clients["http"] = openai.DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            )
+        return clients["http"]
+
+
+def openai_client():
+    http = http_client()
+    with clients_lock:
+        if "openai" not in clients:
+            # retries are done here, with the deadline in mind, not by the SDK
+            clients["openai"] = openai.OpenAI(http_client=http, max_retries=0, timeout=LLM_TIMEOUT)
+        return clients["openai"]
+
+
+def gemini_model(model):
+    with clients_lock:
+        if "genai" not in clients:
+            import google.generativeai as genai
+            if GEMINI_ENDPOINT:
+                genai.configure(
+                    api_key=os.getenv("GEMINI_API_KEY", "fake"),
+                    transport="rest",
+                    client_options={"api_endpoint": GEMINI_ENDPOINT},
+                )
+            else:
+                genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+            clients["genai"] = genai
+        key = f"gemini:{model}"
+        if key not in clients:
+            clients[key] = clients["genai"].GenerativeModel(model)
+        return clients[key]
+
+
+def retryable(error):
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    try:
+        from google.api_core import exceptions as google_errors
+    except ImportError:
+        return False
+    return isinstance(error, (
+        google_errors.TooManyRequests,
+        google_errors.InternalServerError,
+        google_errors.BadGateway,
+        google_errors.ServiceUnavailable,
+        google_errors.GatewayTimeout,
+        google_errors.DeadlineExceeded,
+    ))
+
+
+def backoff(attempt, error):
+    # full jitter, so callers that failed together don't all come back together
+    delay = random.uniform(0, min(LLM_MAX_BACKOFF, LLM_BACKOFF * 2 ** attempt))
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
+
+
+def with_retries(model, fn, deadline, retries=LLM_MAX_RETRIES):
+    '''
+    calls fn(seconds_left) until it succeeds, retrying transient errors while the
+    backoff still fits before `deadline`
+    '''
+    limiter = limiter_for(model)
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            limiter.count("failures")
+            raise ProviderUnavailable(f"{model} ran out of time after {attempt} attempts")
+        try:
+            return fn(remaining)
+        except Exception as error:
+            if not retryable(error):
+                raise
+            delay = backoff(attempt, error)
+            if attempt >= retries or time.monotonic() + delay >= deadline:
+                limiter.count("failures")
+                raise ProviderUnavailable(f"{model} failed after {attempt + 1} attempts: {error}") from error
+            limiter.count("retries")
+            print(f"{model} attempt {attempt + 1} failed ({type(error).__name__}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def call(model, fn, timeout=LLM_TIMEOUT, retries=LLM_MAX_RETRIES):
+    '''
+    runs fn(seconds_left) under the model's concurrency limit with retries,
+    the building block for the helpers below
+    '''
+    deadline = time.monotonic() + timeout
+    with limiter_for(model).slot(model, deadline):
+        return with_retries(model, fn, deadline, retries)
+
+
+def chat(model, messages, timeout=LLM_TIMEOUT, **kwargs):
+    return call(model, lambda remaining: openai_client().chat.completions.create(
+        model=model, messages=messages, timeout=remaining, **kwargs
+    ), timeout)
+
+
+def parse(model, messages, response_format, timeout=LLM_TIMEOUT, **kwargs):
+    return call(model, lambda remaining: openai_client().beta.chat.completions.parse(
+        model=model, messages=messages, response_format=response_format, timeout=remaining, **kwargs
+    ), timeout)
+
+
+def chat_stream(model, messages, timeout=LLM_TIMEOUT, **kwargs):
+    '''
+    yields the chunks of a streamed chat completion. only opening the stream is
+    retried, the slot is held until the stream is consumed or closed
+    '''
+    deadline = time.monotonic() + timeout
+    with limiter_for(model).slot(model, deadline):
+        stream = with_retries(model, lambda remaining: openai_client().chat.completions.create(
+            model=model, messages=messages, stream=True, timeout=remaining, **kwargs
+        ), deadline)
+        with stream:
+            yield from stream
+
+
+@contextmanager
+def parse_stream(model, messages, response_format, timeout=LLM_TIMEOUT, **kwargs):
+    '''
+    the structured-output stream (what client.beta.chat.completions.stream gives
+    inside its with block), holding the model's slot for as long as it is open
+    '''
+    deadline = time.monotonic() + timeout
+    with limiter_for(model).slot(model, deadline):
+        stream = with_retries(model, lambda remaining: openai_client().beta.chat.completions.stream(
+            model=model, messages=messages, response_format=response_format, timeout=remaining, **kwargs
+        ).__enter__(), deadline)
+        try:
+            yield stream
+        finally:
+            stream.close()
+
+
+def transcribe(model, file, timeout=LLM_TIMEOUT, **kwargs):
+    return call(model, lambda remaining: openai_client().audio.transcriptions.create(
+        model=model, file=file, timeout=remaining, **kwargs
+    ), timeout).text
+
+
+def speech(model, voice, text, timeout=LLM_TIMEOUT, **kwargs):
+    '''
+    returns the synthesized audio bytes
+    '''
+    def synthesize(remaining):
+        with openai_client().audio.speech.with_streaming_response.create(
+            model=model, voice=voice, input=text, timeout=remaining, **kwargs
+        ) as response:
+            return response.read()
+    return call(model, synthesize, timeout)
+
+
+def embed(model, texts, timeout=LLM_TIMEOUT, **kwargs):
+    '''
+    one vector per text, in requests of at most LLM_EMBED_BATCH texts
+    '''
+    vectors = []
+    for i in range(0, len(texts), LLM_EMBED_BATCH):
+        batch = texts[i:i + LLM_EMBED_BATCH]
+        response = call(model, lambda remaining: openai_client().embeddings.create(
+            model=model, input=batch, timeout=remaining, **kwargs
+        ), timeout)
+        vectors.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+    return vectors
+
+
+class ProviderEmbeddings(Embeddings):
+    '''
+    langchain Embeddings on top of embed(), for CachedEmbeddings and the vector stores
+    '''
+
+    def __init__(self, model):
+        self.model = model
+
+    def embed_documents(self, texts):
+        return embed(self.model, list(texts))
+
+    def embed_query(self, text):
+        return embed(self.model, [text])[0]
+
+
+def generate(model, contents, timeout=LLM_TIMEOUT, **kwargs):
+    '''
+    gemini generate_content, returns the response object
+    '''
+    return call(model, lambda remaining: gemini_model(model).generate_content(
+        contents, request_options={"timeout": remaining}, **kwargs
+    ), timeout)
+
+
+def metrics():
+    with clients_lock:
+        current = dict(limiters)
+    return {model: limiter.metrics() for model, limiter in current.items()}
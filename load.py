@@ -1,8 +1,9 @@
 import os
 import ast
+import json
+import hashlib
 from dotenv import load_dotenv
 from langchain_openai.chat_models import ChatOpenAI
-from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain_community.document_loaders import TextLoader
 from langchain_pinecone import PineconeVectorStore
 from langchain_text_splitters import CharacterTextSplitter
@@ -10,21 +11,71 @@ from pinecone import Pinecone
 from langchain_community.vectorstores import Pinecone as Pine
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from embedding_cache import CachedEmbeddings
+import llm_client
+from numpy_vectorstore import NumpyVectorStore
 
 from langchain_community.llms import Ollama
 
 load_dotenv()
-OPENAI_KEY=os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY=os.getenv("PINECONE_API_KEY")
+# set to skip the index lookup and talk to that host, e.g. fake_providers.py
+PINECONE_INDEX_HOST=os.getenv("PINECONE_INDEX_HOST")
 
 parser = StrOutputParser()
 
-pc=Pinecone(api_key=PINECONE_API_KEY)
-index=pc.Index("people")
-embeddings = OpenAIEmbeddings( model="text-embedding-3-small", openai_api_key=OPENAI_KEY)
-vectorstore=PineconeVectorStore(index, embeddings)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+
+embeddings = CachedEmbeddings(llm_client.ProviderEmbeddings("text-embedding-3-small"), "text-embedding-3-small")
+if VECTOR_BACKEND == "numpy":
+    vectorstore=NumpyVectorStore.load(embeddings)
+else:
+    pc=Pinecone(api_key=PINECONE_API_KEY)
+    index=pc.Index("people", host=PINECONE_INDEX_HOST) if PINECONE_INDEX_HOST else pc.Index("people")
+    vectorstore=PineconeVectorStore(index, embeddings)
+
+MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", f"people_manifest.{VECTOR_BACKEND}.json")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+
+def chunk_id(doc):
+    # the id is the content hash, so an unchanged chunk keeps its vector across runs
+    return hashlib.sha256(doc.page_content.encode()).hexdigest()
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_PATH)
+
+def upsert(ids, vectors, docs):
+    if VECTOR_BACKEND == "numpy":
+        vectorstore.add_vectors(vectors, [d.page_content for d in docs], [d.metadata for d in docs], ids)
+        return
+    for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+        index.upsert(vectors=[
+            {"id": _id, "values": vector, "metadata": {**doc.metadata, "text": doc.page_content}}
+            for _id, vector, doc in zip(ids[start:start + UPSERT_BATCH_SIZE], vectors[start:start + UPSERT_BATCH_SIZE], docs[start:start + UPSERT_BATCH_SIZE])
+        ])
+
+def delete(ids):
+    if VECTOR_BACKEND == "numpy":
+        vectorstore.delete(ids)
+        return
+    for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+        index.delete(ids=ids[start:start + UPSERT_BATCH_SIZE])
 
 def load_data():
+    '''
+    incremental re-index of people.txt: only new or changed chunks are embedded and
+    upserted, chunks that disappeared are deleted. the manifest remembers what is indexed
+    '''
     loader = TextLoader(r"people.txt")
     documents = loader.load()
     text_splitter = CharacterTextSplitter(
@@ -34,10 +85,45 @@ def load_data():
         length_function=len,
         is_separator_regex=False, )
     docs=text_splitter.split_documents(documents)
-    embeddings = OpenAIEmbeddings( model="text-embedding-3-small", openai_api_key=OPENAI_KEY)
-    index_name="people"
-    Pinecone=PineconeVectorStore.from_documents(docs,embeddings,index_name=index_name)
-    print(Pinecone.similarity_search("eating disorder", k=3))
+    current = {}
+    for doc in docs:
+        current.setdefault(chunk_id(doc), doc)
+
+    manifest = load_manifest()
+    if manifest is None:
+        # no record of what's in the index (e.g. it was built by from_documents with random ids),
+        # start from an empty one so we don't end up with duplicates
+        print("No manifest found, rebuilding the index from scratch")
+        if VECTOR_BACKEND == "numpy":
+            vectorstore.delete(list(vectorstore.ids))
+        else:
+            index.delete(delete_all=True)
+        manifest = {"chunks": {}}
+
+    indexed = manifest["chunks"]
+    added = [_id for _id in current if _id not in indexed]
+    removed = [_id for _id in indexed if _id not in current]
+    unchanged = len(current) - len(added)
+
+    for start in range(0, len(added), EMBED_BATCH_SIZE):
+        batch_ids = added[start:start + EMBED_BATCH_SIZE]
+        batch_docs = [current[_id] for _id in batch_ids]
+        vectors = embeddings.embed_documents([d.page_content for d in batch_docs])
+        upsert(batch_ids, vectors, batch_docs)
+        for _id, doc in zip(batch_ids, batch_docs):
+            indexed[_id] = {"source": doc.metadata.get("source"), "chars": len(doc.page_content)}
+        save_manifest(manifest)
+    if removed:
+        delete(removed)
+        for _id in removed:
+            del indexed[_id]
+    save_manifest(manifest)
+    if VECTOR_BACKEND == "numpy":
+        vectorstore.save()
+
+    print(f"Chunks: {len(current)} total, {unchanged} unchanged (skipped), {len(added)} embedded and upserted, {len(removed)} deleted")
+    print(vectorstore.similarity_search("eating disorder", k=3))
+    print("Embedding cache:", embeddings.metrics())
     
 
 
@@ -1,15 +1,17 @@
-from openai import OpenAI
 from dotenv import load_dotenv
+import llm_client
+from history import TokenBudgetHistory
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 load_dotenv()
 import os
+import re
 
 
 
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
 
-client = OpenAI()
-
 Prescription = """Prescription
 
 Patient Name: Jane Doe
@@ -53,9 +55,7 @@ Anytown, State ZIP
 Phone: (123) 456-7890
 Email: info@wellnessmhc.com
 """
-messages=[{
-                'role': 'system',
-                'content': f""""You are a mental health professional and your job is to perform a daily check up by
+SYSTEM_PROMPT = f""""You are a mental health professional and your job is to perform a daily check up by
                 talking to the user and taking a record of things that the user has done on that particular day.
                 You need to talk to the user and ask them questions based on their prescription. For ecample, 
                 ask them if they have taken their required medicine or not, if they have doe some kind of physical activity or no etc.
@@ -80,31 +80,47 @@ messages=[{
                 Like, instead of saying “I understand your question. The answer is yes, I can assist with that,” 
                 it’d be more like “Yeah, I get it! Totally, I can help you with that.”
                 """
-            }]
 
-def nike():
-    audio_file= open("input.mp3", "rb")
-    transcription = client.audio.transcriptions.create(
-    model="whisper-1", 
-    file=audio_file
-    )
-    print(transcription.text)
+def new_messages():
+    return [{'role': 'system', 'content': SYSTEM_PROMPT}]
+
+# state for running this file directly, the server keeps one per session
+messages=new_messages()
+
+default_history = TokenBudgetHistory()
+
+def transcribe(audio=None):
+    '''
+    `audio` is an in-memory (filename, bytes) upload, None reads input.mp3 like running this file does
+    '''
+    if audio is None:
+        with open("input.mp3", "rb") as f:
+            audio = ("input.mp3", f.read())
+    text = llm_client.transcribe("whisper-1", audio)
+    print(text)
+    return text
+
+def nike(messages=None, history=None, audio=None):
+    '''
+    returns the spoken answer as mp3 bytes. without `audio` it reads input.mp3 and
+    also writes speech.mp3
+    '''
+    if messages is None:
+        messages, history = get_messages(), default_history
+    text = transcribe(audio)
 
 
 
     formatted_user_query = f"""
         This is the Query:\n
-        {transcription.text}
+        {text}
     """
     messages.append(
             {
                 'role': 'user',
-                'content': transcription.text
+                'content': text
             })
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
-    )
+    response = llm_client.chat("gpt-4o", history.window(messages))
     out = response.choices[0].message.content
     print(out)
     messages.append(
@@ -114,19 +130,76 @@ def nike():
             })
     
 
-    with client.audio.speech.with_streaming_response.create(
-    model="tts-1-hd",
-    voice="shimmer",
-    input=out
-    ) as  response:
-        response.stream_to_file("speech.mp3")
+    speech = synthesize(out)
+    if audio is None:
+        with open("speech.mp3", "wb") as f:
+            f.write(speech)
+    return speech
   
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+# sentences shorter than this are merged with the next one, except the first so audio starts early
+TTS_MIN_CHARS = int(os.getenv("TTS_MIN_CHARS", "60"))
+SENTENCE_END = re.compile(r'(?<=[.!?…])["\')\]]*\s+')
+tts_pool = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+
+def split_sentences(text, min_chars):
+    '''
+    returns (complete pieces ready for TTS, leftover text still being generated)
+    '''
+    pieces = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        piece = text[start:match.end()].strip()
+        if len(piece) >= min_chars or (not pieces and min_chars <= 1):
+            pieces.append(piece)
+            start = match.end()
+            min_chars = max(min_chars, TTS_MIN_CHARS)
+    return pieces, text[start:]
+
+def synthesize(text):
+    return llm_client.speech("tts-1-hd", "shimmer", text)
+
+def nike_stream(messages=None, history=None, audio=None):
+    '''
+    pipelined nike: streams the chat completion, starts TTS on each sentence as soon
+    as it's complete and yields mp3 bytes in order, so the first audio is ready
+    after about one sentence instead of after the whole answer
+    '''
+    if messages is None:
+        messages, history = get_messages(), default_history
+    messages.append({'role': 'user', 'content': transcribe(audio)})
+
+    stream = llm_client.chat_stream("gpt-4o", history.window(messages))
+    out = ""
+    buffer = ""
+    pending = deque()
+    min_chars = 1
+    for chunk in stream:
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        out += chunk.choices[0].delta.content
+        buffer += chunk.choices[0].delta.content
+        pieces, buffer = split_sentences(buffer, min_chars)
+        for piece in pieces:
+            pending.append(tts_pool.submit(synthesize, piece))
+            min_chars = TTS_MIN_CHARS
+        # hand over whatever audio is already done without blocking generation
+        while pending and pending[0].done():
+            yield pending.popleft().result()
+    if buffer.strip():
+        pending.append(tts_pool.submit(synthesize, buffer.strip()))
+    print(out)
+    messages.append({'role': 'assistant', 'content': out})
+    while pending:
+        yield pending.popleft().result()
+
 def get_messages():
     return messages
 
 def reset():
     global messages
-    messages = []
+    messages = new_messages()
+    default_history.reset()
 
 
 if __name__ == '__main__':
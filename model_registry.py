@@ -0,0 +1,68 @@
+import os
+import time
+import threading
+
+# comma separated model names to load at startup, e.g. PRELOAD_MODELS=whisper,sentiment
+# "all" loads everything, empty (the default) loads nothing until it's first used
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "")
+
+loaders = {}
+models = {}
+load_times = {}
+locks = {}
+registry_lock = threading.Lock()
+
+
+def register(name, loader):
+    '''
+    registers a zero-argument loader, nothing is loaded until get(name) or warmup()
+    '''
+    with registry_lock:
+        loaders[name] = loader
+        locks.setdefault(name, threading.Lock())
+
+
+def get(name):
+    if name in models:
+        return models[name]
+    if name not in loaders:
+        raise KeyError(f"Unknown model: {name}")
+    with locks[name]:
+        # another thread may have finished loading while we waited
+        if name not in models:
+            start = time.perf_counter()
+            models[name] = loaders[name]()
+            load_times[name] = time.perf_counter() - start
+            print(f"Loaded {name} in {load_times[name]:.2f}s")
+    return models[name]
+
+
+def is_loaded(name):
+    return name in models
+
+
+def warmup(names=None):
+    '''
+    loads the given models (all registered ones if None) and returns their load times
+    '''
+    if names is None:
+        names = list(loaders)
+    for name in names:
+        get(name)
+    return {name: load_times[name] for name in names}
+
+
+def preload(setting=PRELOAD_MODELS):
+    names = [name.strip() for name in setting.split(",") if name.strip()]
+    if not names:
+        return {}
+    if names == ["all"]:
+        return warmup()
+    return warmup(names)
+
+
+def status():
+    return {
+        name: {"loaded": name in models, "load_time": load_times.get(name)}
+        for name in loaders
+    }
@@ -1,10 +1,9 @@
-from pymongo import MongoClient
-from sentiment import get_sentiment
-from summary import get_summary
-from takeaways import get_takeaways
-from mood import get_mood
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from enrichment import submit_enrichment, resume_pending_enrichment, PENDING
+from db_indexes import ensure_indexes
 from datetime import datetime
 import time
+import base64
 from bson import ObjectId
 
 client = MongoClient("mongodb://localhost:27017/")
@@ -14,10 +13,103 @@ user_info = db["user_info"]
 user_data = db["user_data"]
 prescriptions = db["prescriptions"]
 
-def get_timeline(user_id):
+TIMELINE_DEFAULT_LIMIT = 50
+TIMELINE_MAX_LIMIT = 200
+# drop the full conversation/notes bodies when the client only needs the cards
+TIMELINE_COMPACT_PROJECTION = {"content": 0}
+
+def resume_enrichment():
+    return resume_pending_enrichment(user_data)
+
+def create_indexes():
+    # the indexes behind every query below, see db_indexes.INDEXES
+    return ensure_indexes(db)
+
+def encode_timeline_cursor(item):
+    raw = f"{item.get('timestamp')}|{item['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_timeline_cursor(cursor):
+    '''
+    returns (timestamp, _id) from an opaque cursor, raises ValueError if it is garbage
+    '''
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, _id = raw.split("|", 1)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if timestamp == "None":
+        timestamp = None
+    else:
+        timestamp = float(timestamp)
+        if timestamp.is_integer():
+            timestamp = int(timestamp)
+    if ObjectId.is_valid(_id):
+        _id = ObjectId(_id)
+    elif _id.lstrip("-").isdigit():
+        _id = int(_id)
+    return timestamp, _id
+
+def _keyset_filter(timestamp, _id, older):
+    # documents without a timestamp sort last in a descending sort, so they are
+    # always "older" than anything that has one
+    if older:
+        if timestamp is None:
+            return {"timestamp": None, "_id": {"$lt": _id}}
+        return {"$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": _id}},
+            {"timestamp": None},
+        ]}
+    if timestamp is None:
+        return {"$or": [
+            {"timestamp": {"$ne": None}},
+            {"timestamp": None, "_id": {"$gt": _id}},
+        ]}
+    return {"$or": [
+        {"timestamp": {"$gt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$gt": _id}},
+    ]}
+
+def timeline_query(user_id, before=None, after=None, item_type=None):
+    '''
+    (filter, sort) of a get_timeline page, `after` pages are read oldest first
+    '''
     query = {"user_id": user_id}
-    timeline = user_data.find(query).sort("timestamp", -1)
-    return list(timeline)
+    if item_type:
+        query["type"] = item_type
+    if before:
+        query.update(_keyset_filter(*decode_timeline_cursor(before), older=True))
+    elif after:
+        query.update(_keyset_filter(*decode_timeline_cursor(after), older=False))
+        return query, [("timestamp", ASCENDING), ("_id", ASCENDING)]
+    return query, [("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+def get_timeline(user_id, limit=None, before=None, after=None, item_type=None, compact=False):
+    '''
+    newest-first page of the user's timeline, keyset paginated on (timestamp, _id).
+    `before` pages towards older items, `after` towards newer ones, both take a cursor
+    from encode_timeline_cursor. returns (items, next_cursor, prev_cursor).
+    with no limit and no cursor it's the whole timeline, as before pagination,
+    so clients that don't page keep getting everything
+    '''
+    query, sort = timeline_query(user_id, before, after, item_type)
+    projection = TIMELINE_COMPACT_PROJECTION if compact else None
+    if limit is None and not before and not after:
+        return list(user_data.find(query, projection).sort(sort)), None, None
+    limit = min(max(int(limit or TIMELINE_DEFAULT_LIMIT), 1), TIMELINE_MAX_LIMIT)
+    # fetch one extra to know if there is another page without a count()
+    timeline = list(user_data.find(query, projection).sort(sort).limit(limit + 1))
+    has_more = len(timeline) > limit
+    if after and not before:
+        timeline = timeline[:limit][::-1]
+        next_cursor = encode_timeline_cursor(timeline[-1]) if timeline else None
+        prev_cursor = encode_timeline_cursor(timeline[0]) if timeline and has_more else None
+    else:
+        timeline = timeline[:limit]
+        next_cursor = encode_timeline_cursor(timeline[-1]) if timeline and has_more else None
+        prev_cursor = encode_timeline_cursor(timeline[0]) if timeline and before else None
+    return timeline, next_cursor, prev_cursor
 
 def get_prescriptions(user_id):
     query = {"user_id": user_id}
@@ -25,10 +117,10 @@ def get_prescriptions(user_id):
     return list(user_prescriptions)
 
 def add_conversation(user_id, conversation, conversation_with, conversation_type):
-    summary = get_summary(conversation)
-    sentiment = get_sentiment(conversation)
-    mood = get_mood(conversation, sentiment)
-    takeaways = get_takeaways(conversation)
+    '''
+    stores the raw conversation right away and queues summary/sentiment/mood/takeaways
+    '''
+    raw_conversation = list(conversation)
     conversation = conversation[1:]
     conversation = [{"sender": i["role"], "message": i["content"]} for i in conversation]
     conversation_data = {
@@ -36,31 +128,27 @@ def add_conversation(user_id, conversation, conversation_with, conversation_type
         "type": conversation_type,  # 'bot_conversation' or 'connection_conversation'
         "conversation_with": conversation_with,  # None for bot_conversation
         "content": conversation,
-        "summary": summary,
-        "sentiment": sentiment,
-        "mood": mood,
-        "takeaways": takeaways,
+        "enrichment_status": PENDING,
         "timestamp": int(time.time()) * 1000
     }
     print(conversation_data)
-    user_data.insert_one(conversation_data)
+    result = user_data.insert_one(conversation_data)
+    submit_enrichment(user_data, result.inserted_id, raw_conversation, with_takeaways=True)
+    return result.inserted_id
 
 def add_notes(user_id, notes):
-    summary = get_summary(notes)
-    sentiment = get_sentiment(notes)
-    mood = get_mood(notes, sentiment)
     notes_data = {
         "user_id": user_id,
         "type": "notes",
         "content": notes,
-        "summary": summary,
-        "sentiment": sentiment,
-        "mood": mood,
+        "enrichment_status": PENDING,
         "timestamp": int(time.time()) * 1000
     }
     print(notes_data)
     
-    user_data.insert_one(notes_data)
+    result = user_data.insert_one(notes_data)
+    submit_enrichment(user_data, result.inserted_id, notes)
+    return result.inserted_id
 
 def add_connection(user_id, connection_name, connection_user_id):
     connection_data = {
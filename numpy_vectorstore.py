@@ -0,0 +1,126 @@
+import os
+import json
+import uuid
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", "people_index.npz")
+
+
+class NumpyVectorStore(VectorStore):
+    '''
+    in-process index for small corpora like people.txt. embeddings are L2-normalised
+    rows of one contiguous float32 matrix, so top-k is a single matrix-vector product
+    '''
+
+    def __init__(self, embedding, matrix=None, ids=None, texts=None, metadatas=None):
+        self._embedding = embedding
+        self.matrix = matrix if matrix is not None else np.zeros((0, 0), dtype=np.float32)
+        self.ids = list(ids or [])
+        self.texts = list(texts or [])
+        self.metadatas = list(metadatas or [])
+        self.lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    def add_vectors(self, vectors, texts, metadatas=None, ids=None):
+        vectors = self._normalize(vectors)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        with self.lock:
+            # re-adding an id replaces it, same as a pinecone upsert
+            existing = set(ids) & set(self.ids)
+            if existing:
+                self._delete(existing)
+            if self.matrix.size:
+                self.matrix = np.ascontiguousarray(np.vstack([self.matrix, vectors]))
+            else:
+                self.matrix = np.ascontiguousarray(vectors)
+            self.ids.extend(ids)
+            self.texts.extend(texts)
+            self.metadatas.extend(metadatas)
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas, ids)
+
+    def _delete(self, ids):
+        keep = [i for i, _id in enumerate(self.ids) if _id not in ids]
+        self.matrix = np.ascontiguousarray(self.matrix[keep]) if keep else np.zeros((0, 0), dtype=np.float32)
+        self.ids = [self.ids[i] for i in keep]
+        self.texts = [self.texts[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+
+    def delete(self, ids=None, **kwargs):
+        with self.lock:
+            self._delete(set(ids or []))
+        return True
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None, **kwargs):
+        with self.lock:
+            if not self.ids:
+                return []
+            scores = self.matrix @ self._normalize(embedding)
+            if filter:
+                mask = np.array([all(m.get(key) == value for key, value in filter.items()) for m in self.metadatas])
+                scores = np.where(mask, scores, -np.inf)
+            k = min(k, len(self.ids))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (Document(page_content=self.texts[i], metadata=self.metadatas[i], id=self.ids[i]), float(scores[i]))
+                for i in top if np.isfinite(scores[i])
+            ]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, **kwargs):
+        store = cls(embedding)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+    def save(self, path=VECTOR_INDEX_PATH):
+        with self.lock:
+            tmp = path + ".tmp.npz"
+            np.savez(
+                tmp,
+                matrix=self.matrix,
+                ids=np.array(self.ids, dtype=str),
+                texts=np.array(self.texts, dtype=str),
+                metadatas=np.array([json.dumps(m) for m in self.metadatas], dtype=str),
+            )
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, embedding, path=VECTOR_INDEX_PATH):
+        if not os.path.exists(path):
+            return cls(embedding)
+        with np.load(path) as data:
+            return cls(
+                embedding,
+                matrix=np.ascontiguousarray(data["matrix"], dtype=np.float32),
+                ids=data["ids"].tolist(),
+                texts=data["texts"].tolist(),
+                metadatas=[json.loads(m) for m in data["metadatas"].tolist()],
+            )
@@ -9,11 +9,20 @@ import base64
 import io
 import time
 import string
-import google.generativeai as genai
+import llm_client
+import model_registry
+
+
+def load_nltk_data():
+    nltk.download('words')
+    nltk.download('punkt_tab')
+    nltk.download('punkt')
+    return set(words.words())
+
+
+model_registry.register("nltk_words", load_nltk_data)
+
 
-nltk.download('words')
-nltk.download('punkt_tab')
-nltk.download('punkt')
 def extract_pdf_content(file_path, image_output_dir):
     # Open the PDF file
     pdf_document = fitz.open(file_path)
@@ -70,12 +79,12 @@ def encode_image(image_path):
 
 
 def clean_text(text):
+    # Load English words (and the tokenizer data on first use)
+    english_words = model_registry.get("nltk_words")
+
     # Tokenize the text
     tokens = word_tokenize(text)
 
-    # Load English words
-    english_words = set(words.words())
-
     # Remove punctuation
     tokens = [token.lower() for token in tokens if token not in string.punctuation]
 
@@ -93,9 +102,6 @@ def perform_ocr_with_gemini(image_path):
     print("OCR starting")
     ocr_start_time = time.time()
     base64_image = encode_image(image_path)
-    # Set up the model
-    model = genai.GenerativeModel('gemini-1.5-flash')
-
     # Create the contents list with the image and prompt
     contents = [
         {
@@ -107,7 +113,7 @@ def perform_ocr_with_gemini(image_path):
         }
     ]
     # Generate content
-    response = model.generate_content(contents)
+    response = llm_client.generate('gemini-1.5-flash', contents)
     print("OCR done. Time taken: ", time.time() - ocr_start_time)
     return response.text
 
@@ -1,21 +1,24 @@
 
 from dotenv import load_dotenv
 import os
+import json
+import hashlib
 from pydantic import BaseModel
 import instructor
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from openai import OpenAI
-from langchain_openai.embeddings import OpenAIEmbeddings
+import llm_client
 from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone
+import model_registry
+from semantic_cache import SemanticCache
+from embedding_cache import CachedEmbeddings
+from numpy_vectorstore import NumpyVectorStore
+from history import TokenBudgetHistory
+from streaming import field_deltas
 load_dotenv()
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
-client = OpenAI()
-messages=[
-            {
-                'role': 'system',
-                'content': """"You are a mental health professional and your job is to help the user with their query and if required recommend them to talk with 
+SYSTEM_PROMPT = """"You are a mental health professional and your job is to help the user with their query and if required recommend them to talk with 
                 people who have similar experiences based on the information provided to you.
 
                 **Guidelines:**
@@ -23,15 +26,43 @@ messages=[
                 Only recommend people if you think it is necessary and if you think it will help the user.
                 You can always ask for more information if required.
                 Respond in the format provided to you"""
-            }
-]
+
+def new_messages():
+    return [{'role': 'system', 'content': SYSTEM_PROMPT}]
+
+# state for the command line loop below, the server keeps one per session
+messages=new_messages()
+default_history = TokenBudgetHistory()
 
 
 PINECONE_API_KEY=os.getenv("PINECONE_API_KEY")
-pc=Pinecone(api_key=PINECONE_API_KEY)
-index=pc.Index("people")
-embeddings = OpenAIEmbeddings( model="text-embedding-3-small")
-vectorstore=PineconeVectorStore(index, embeddings)
+# set to skip the index lookup and talk to that host, e.g. fake_providers.py
+PINECONE_INDEX_HOST=os.getenv("PINECONE_INDEX_HOST")
+
+# "pinecone" (default) or "numpy" for the in-process index written by load.py
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+
+def load_vectorstore():
+    embeddings = CachedEmbeddings(llm_client.ProviderEmbeddings("text-embedding-3-small"), "text-embedding-3-small")
+    if VECTOR_BACKEND == "numpy":
+        return NumpyVectorStore.load(embeddings)
+    pc=Pinecone(api_key=PINECONE_API_KEY)
+    index=pc.Index("people", host=PINECONE_INDEX_HOST) if PINECONE_INDEX_HOST else pc.Index("people")
+    return PineconeVectorStore(index, embeddings)
+
+model_registry.register("people_vectorstore", load_vectorstore)
+
+# serve near-duplicate first questions ("I'm always anxious" / "I feel anxious all the time")
+# from cache instead of another embedding + pinecone + gpt-4o round trip
+RECC_SEMANTIC_CACHE = os.getenv("RECC_SEMANTIC_CACHE", "false").lower() in ("1", "true")
+RECC_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("RECC_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+RECC_SEMANTIC_CACHE_SIZE = int(os.getenv("RECC_SEMANTIC_CACHE_SIZE", "512"))
+RECC_SEMANTIC_CACHE_TTL = float(os.getenv("RECC_SEMANTIC_CACHE_TTL", str(24 * 60 * 60)))
+semantic_cache = SemanticCache(
+    threshold=RECC_SEMANTIC_CACHE_THRESHOLD,
+    max_entries=RECC_SEMANTIC_CACHE_SIZE,
+    ttl=RECC_SEMANTIC_CACHE_TTL,
+) if RECC_SEMANTIC_CACHE else None
 
 
 class Person(BaseModel):
@@ -45,8 +76,35 @@ class Output(BaseModel):
     people: list[Person]
 
 
-def answer(query):  
-    context=vectorstore.similarity_search(query, k=3)
+def get_messages():
+    return messages
+
+
+def history_key(messages):
+    # a cached answer is only reusable when the conversation before the query is the same,
+    # in practice that means both were the first message of a conversation
+    return hashlib.sha256(json.dumps(messages[1:], default=str).encode()).hexdigest()
+
+
+def prepare(query, messages):
+    '''
+    retrieval + semantic cache lookup shared by answer and answer_stream.
+    returns (query_vector, context_key, cached_output_or_None)
+    '''
+    vectorstore = model_registry.get("people_vectorstore")
+    query_vector = None
+    context_key = None
+    if semantic_cache is not None:
+        query_vector = vectorstore.embeddings.embed_query(query)
+        context_key = history_key(messages)
+        cached = semantic_cache.lookup(query_vector, context_key)
+        if cached is not None:
+            messages.append({'role': 'user', 'content': query})
+            messages.append({'role': 'assistant', 'content': str(cached)})
+            return query_vector, context_key, cached
+        context=[doc for doc, _ in vectorstore.similarity_search_by_vector_with_score(query_vector, k=3)]
+    else:
+        context=vectorstore.similarity_search(query, k=3)
     formatted_user_query = f"""
         This is the Query:\n
         {query}
@@ -59,16 +117,50 @@ def answer(query):
                 'role': 'user',
                 'content': query
             })
-    response = client.beta.chat.completions.parse(
-        model="gpt-4o",
-        messages=messages,
-        response_format=Output
-    )
-    response = response.choices[0].message.parsed
+    return query_vector, context_key, None
+
+
+def finish(response, messages, query_vector, context_key):
+    if semantic_cache is not None:
+        semantic_cache.add(query_vector, context_key, response)
     messages.append({'role': 'assistant', 'content': str(response)})
     return response
 
 
+def answer(query, messages=None, history=None):  
+    '''
+    appends the query and the answer to `messages`, `history` is the TokenBudgetHistory
+    that goes with that message list. defaults to the module level conversation
+    '''
+    if messages is None:
+        messages, history = get_messages(), default_history
+    query_vector, context_key, cached = prepare(query, messages)
+    if cached is not None:
+        return cached
+    response = llm_client.parse("gpt-4o", history.window(messages), Output)
+    response = response.choices[0].message.parsed
+    return finish(response, messages, query_vector, context_key)
+
+
+def answer_stream(query, messages=None, history=None):
+    '''
+    same as answer, but yields ("delta", text) as the response text is generated
+    and then ("final", Output) once the people have been filled in
+    '''
+    if messages is None:
+        messages, history = get_messages(), default_history
+    query_vector, context_key, cached = prepare(query, messages)
+    if cached is not None:
+        yield "delta", cached.response
+        yield "final", cached
+        return
+    with llm_client.parse_stream("gpt-4o", history.window(messages), Output) as stream:
+        for text in field_deltas(stream, "response"):
+            yield "delta", text
+        response = stream.get_final_completion().choices[0].message.parsed
+    yield "final", finish(response, messages, query_vector, context_key)
+
+
 if __name__=="__main__":
     while True:
         user_input = input("You: ")
@@ -0,0 +1,81 @@
+import time
+import threading
+import numpy as np
+
+
+class SemanticCache:
+    '''
+    serves a cached answer when a new query embeds within `threshold` cosine
+    similarity of an earlier one. entries are only compared within the same
+    context key, and the least recently used entry is evicted when full
+    '''
+
+    def __init__(self, threshold=0.92, max_entries=512, ttl=24 * 60 * 60):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.vectors = None
+        self.keys = []
+        self.values = []
+        self.created = []
+        self.last_used = []
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _remove(self, i):
+        self.vectors = np.delete(self.vectors, i, axis=0)
+        for column in (self.keys, self.values, self.created, self.last_used):
+            del column[i]
+
+    def _expire(self, now):
+        expired = [i for i, created in enumerate(self.created) if now - created > self.ttl]
+        for i in reversed(expired):
+            self._remove(i)
+
+    def lookup(self, vector, context_key):
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / np.linalg.norm(vector)
+        with self.lock:
+            now = time.time()
+            self._expire(now)
+            if not self.keys:
+                self.misses += 1
+                return None
+            scores = self.vectors @ vector
+            for i, key in enumerate(self.keys):
+                if key != context_key:
+                    scores[i] = -1
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.last_used[best] = now
+            return self.values[best]
+
+    def add(self, vector, context_key, value):
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / np.linalg.norm(vector)
+        with self.lock:
+            if len(self.keys) >= self.max_entries:
+                self._remove(int(np.argmin(self.last_used)))
+            now = time.time()
+            if self.vectors is None or not len(self.keys):
+                self.vectors = vector[None, :]
+            else:
+                self.vectors = np.vstack([self.vectors, vector])
+            self.keys.append(context_key)
+            self.values.append(value)
+            self.created.append(now)
+            self.last_used.append(now)
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.keys),
+            "threshold": self.threshold,
+        }
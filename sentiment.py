@@ -1,8 +1,152 @@
-from transformers import pipeline
-sentiment_analysis = pipeline("sentiment-analysis",model="siebert/sentiment-roberta-large-english")
+import os
+import time
+import threading
+import queue
+from concurrent.futures import Future
+import model_registry
+
+SENTIMENT_MODEL = "siebert/sentiment-roberta-large-english"
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "16"))
+# how long the batcher waits for more requests from other threads before running a batch
+SENTIMENT_BATCH_WAIT_MS = float(os.getenv("SENTIMENT_BATCH_WAIT_MS", "10"))
+SENTIMENT_MICROBATCH = os.getenv("SENTIMENT_MICROBATCH", "true").lower() in ("1", "true")
+# "fp32" is the stock pipeline, "int8" dynamically quantizes the Linear layers for CPU
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "fp32")
+SENTIMENT_BACKENDS = ("fp32", "int8")
+
+
+def load_sentiment_pipeline(backend=SENTIMENT_BACKEND):
+    if backend not in SENTIMENT_BACKENDS:
+        raise ValueError(f"Unknown sentiment backend {backend!r}, expected one of {SENTIMENT_BACKENDS}")
+    from transformers import pipeline
+    sentiment_pipeline = pipeline("sentiment-analysis", model=SENTIMENT_MODEL, device=-1 if backend == "int8" else None)
+    if backend == "int8":
+        import torch
+        torch.quantization.quantize_dynamic(sentiment_pipeline.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return sentiment_pipeline
+
+
+model_registry.register("sentiment", load_sentiment_pipeline)
+
+
+def sentiment_analysis(*args, **kwargs):
+    return model_registry.get("sentiment")(*args, **kwargs)
+
+
+def split_into_chunks(text):
+    '''
+    splits text into pieces that fit in the model window, short texts come back as-is
+    '''
+    tokenizer = model_registry.get("sentiment").tokenizer
+    # leave room for <s> and </s>
+    chunk_tokens = tokenizer.model_max_length - 2
+    ids = tokenizer(text, add_special_tokens=False)["input_ids"]
+    if len(ids) <= chunk_tokens:
+        return [(text, max(len(ids), 1))]
+    return [
+        (tokenizer.decode(ids[i:i + chunk_tokens]), len(ids[i:i + chunk_tokens]))
+        for i in range(0, len(ids), chunk_tokens)
+    ]
+
+
+def aggregate(chunk_results):
+    '''
+    token-weighted vote over the chunks of one text: POSITIVE counts +score, NEGATIVE -score
+    '''
+    total = sum(weight for _, weight in chunk_results)
+    signed = sum(
+        (r["score"] if r["label"] == "POSITIVE" else -r["score"]) * weight
+        for r, weight in chunk_results
+    ) / total
+    return {"label": "POSITIVE" if signed >= 0 else "NEGATIVE", "score": abs(signed)}
+
+
+def _classify(texts):
+    # dedupe first so repeated turns and retried notes only hit the model once
+    unique = list(dict.fromkeys(texts))
+    chunks = []
+    owners = []
+    for i, text in enumerate(unique):
+        for chunk, weight in split_into_chunks(text):
+            chunks.append(chunk)
+            owners.append((i, weight))
+    outputs = sentiment_analysis(chunks, batch_size=SENTIMENT_BATCH_SIZE, truncation=True)
+    per_text = [[] for _ in unique]
+    for (i, weight), output in zip(owners, outputs):
+        per_text[i].append((output, weight))
+    results = {text: aggregate(per_text[i]) for i, text in enumerate(unique)}
+    return [results[text] for text in texts]
+
+
+class SentimentBatcher:
+    '''
+    collects get_sentiments calls from different request threads and runs them
+    as one forward pass
+    '''
+
+    def __init__(self, max_batch=SENTIMENT_BATCH_SIZE, wait_ms=SENTIMENT_BATCH_WAIT_MS):
+        self.max_batch = max_batch
+        self.wait = wait_ms / 1000
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        self.thread = threading.Thread(target=self._run, name="sentiment-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, texts):
+        future = Future()
+        self.requests.put((texts, future))
+        return future
+
+    def _run(self):
+        while True:
+            pending = [self.requests.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.wait
+            try:
+                while size < self.max_batch:
+                    item = self.requests.get(timeout=max(deadline - time.monotonic(), 0))
+                    pending.append(item)
+                    size += len(item[0])
+            except queue.Empty:
+                pass
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                results = _classify(texts)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            start = 0
+            for item_texts, future in pending:
+                future.set_result(results[start:start + len(item_texts)])
+                start += len(item_texts)
+
+
+batcher = SentimentBatcher() if SENTIMENT_MICROBATCH else None
+
+
+def get_sentiments(texts):
+    '''
+    batched sentiment for many texts, returns one {"label", "score"} per input text
+    '''
+    texts = list(texts)
+    if not texts:
+        return []
+    if batcher is not None:
+        return batcher.submit(texts).result()
+    return _classify(texts)
+
 
 def get_sentiment(data):
     if isinstance(data, list):
         data = [i["content"] for i in data if i["role"]=="user"]
-    print(sentiment_analysis(data))
-    return sentiment_analysis(data)[0]["label"]
\ No newline at end of file
+    else:
+        data = [data]
+    results = get_sentiments(data)
+    print(results)
+    if not results:
+        return None
+    return results[0]["label"]
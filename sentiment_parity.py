@@ -0,0 +1,140 @@
+import gc
+import os
+import sys
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from sentiment import load_sentiment_pipeline, SENTIMENT_BACKENDS
+
+# python sentiment_parity.py
+# checks that the quantized backend gives the same labels as fp32 on a fixed corpus
+# and reports latency and memory per batch size for each backend. every backend runs
+# in a fresh process, so one backend's memory isn't counted against the next
+
+CORPUS = [
+    "I went for a walk today and it felt great.",
+    "I couldn't sleep again last night and I'm exhausted.",
+    "Took my medication on time, feeling calmer.",
+    "Everything feels pointless lately.",
+    "Had a really good session with my therapist.",
+    "I'm anxious about work tomorrow.",
+    "My friend called and we laughed for an hour.",
+    "I skipped breakfast again, I just wasn't hungry.",
+    "The meditation helped a little bit.",
+    "I feel like nobody understands what I'm going through.",
+    "I finally finished the book I started last month!",
+    "My chest feels tight and I can't stop worrying.",
+    "Journaling tonight made me realise how far I've come.",
+    "I forgot my pills this morning and felt awful all day.",
+    "It was an ordinary day, nothing special happened.",
+    "I'm proud of myself for going to the gym.",
+    "I keep replaying the argument in my head.",
+    "The weather was lovely so I sat in the park.",
+    "I don't want to talk to anyone right now.",
+    "Yoga class was hard but I feel refreshed.",
+    "Work was overwhelming and I cried in the bathroom.",
+    "I cooked a proper dinner for the first time in weeks.",
+    "I'm scared the new medication isn't working.",
+    "Spent the evening with my family, it was nice.",
+    "I feel numb.",
+    "Slept eight hours and woke up with energy.",
+    "My panic attack came back during the meeting.",
+    "I'm grateful for the support group.",
+    "Nothing I do seems to matter.",
+    "Today was a small win, I got out of bed early.",
+    "I'm frustrated that progress is so slow.",
+    "The therapist gave me a new breathing exercise and it works.",
+]
+BATCH_SIZES = [1, 8, 32]
+REPEATS = 3
+
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_mb():
+    # current resident memory, unlike ru_maxrss it goes down again after a peak
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 1024 / 1024
+
+
+class RSSSampler:
+    '''
+    highest resident memory seen while the with block runs, sampled from a thread
+    '''
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stop = threading.Event()
+        self.peak = 0.0
+
+    def _run(self):
+        while not self.stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self.peak = rss_mb()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def model_size_mb(sentiment_pipeline):
+    state = sentiment_pipeline.model.state_dict()
+    total = 0
+    for value in state.values():
+        if hasattr(value, "element_size"):
+            total += value.numel() * value.element_size()
+    return total / 1024 / 1024
+
+
+def run_backend(backend):
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    with RSSSampler() as loading:
+        sentiment_pipeline = load_sentiment_pipeline(backend)
+    load_time = time.perf_counter() - start
+    print(f"\n[{backend}] load {load_time:.2f}s, weights {model_size_mb(sentiment_pipeline):.0f} MB, "
+          f"RSS +{rss_mb() - rss_before:.0f} MB (peak +{loading.peak - rss_before:.0f} MB while loading)")
+    labels = [r["label"] for r in sentiment_pipeline(CORPUS, batch_size=8)]
+    for batch_size in BATCH_SIZES:
+        gc.collect()
+        rss_idle = rss_mb()
+        timings = []
+        with RSSSampler() as running:
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                sentiment_pipeline(CORPUS, batch_size=batch_size)
+                timings.append(time.perf_counter() - start)
+        best = min(timings)
+        batches = -(-len(CORPUS) // batch_size)
+        print(f"[{backend}] batch_size={batch_size:<3} {best * 1000 / batches:8.1f} ms/batch  "
+              f"{len(CORPUS) / best:7.1f} texts/s  peak RSS {running.peak:6.0f} MB (+{running.peak - rss_idle:.0f} MB over idle)")
+    sys.stdout.flush()
+    return labels
+
+
+def main():
+    labels = {}
+    for backend in SENTIMENT_BACKENDS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            labels[backend] = pool.submit(run_backend, backend).result()
+    reference = labels["fp32"]
+    for backend, backend_labels in labels.items():
+        if backend == "fp32":
+            continue
+        agree = sum(a == b for a, b in zip(reference, backend_labels))
+        print(f"\n{backend} vs fp32 label agreement: {agree}/{len(CORPUS)} ({agree / len(CORPUS):.1%})")
+        for text, a, b in zip(CORPUS, reference, backend_labels):
+            if a != b:
+                print(f"  mismatch: {text!r} fp32={a} {backend}={b}")
+
+
+if __name__ == "__main__":
+    main()
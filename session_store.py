@@ -0,0 +1,137 @@
+import os
+import copy
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+# "memory" keeps sessions in this process, "mongo" shares them between workers
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(6 * 60 * 60)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+# compare-and-set attempts before update() gives up on a session everyone is writing to
+SESSION_UPDATE_RETRIES = int(os.getenv("SESSION_UPDATE_RETRIES", "5"))
+LOCK_STRIPES = 64
+
+
+class SessionConflict(Exception):
+    '''
+    the session kept changing under update() for SESSION_UPDATE_RETRIES attempts
+    '''
+
+
+class MemorySessionStore:
+    '''
+    LRU with an idle TTL, sessions are lost on restart and not shared between processes
+    '''
+
+    def __init__(self, new_session, ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES):
+        self.new_session = new_session
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        # update() holds one of these for its session, a fixed set so ids never pile up locks
+        self.key_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def get(self, session_id):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is not None and entry[1] > time.time():
+                self.sessions.move_to_end(session_id)
+                return copy.deepcopy(entry[0])
+        return self.new_session()
+
+    def save(self, session_id, session):
+        with self.lock:
+            self.sessions[session_id] = (copy.deepcopy(session), time.time() + self.ttl)
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_entries:
+                self.sessions.popitem(last=False)
+
+    def update(self, session_id, apply):
+        '''
+        apply(session) on the current session and save it, with no other update of
+        the same session in between. returns the saved session
+        '''
+        with self.key_locks[hash(session_id) % LOCK_STRIPES]:
+            session = self.get(session_id)
+            apply(session)
+            self.save(session_id, session)
+            return session
+
+    def delete(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+
+class MongoSessionStore:
+    '''
+    one document per session in main_db.sessions, expired by a TTL index on updated_at
+    '''
+
+    def __init__(self, new_session, ttl=SESSION_TTL):
+        from pymongo import MongoClient
+        client = MongoClient("mongodb://localhost:27017/")
+        self.collection = client["main_db"]["sessions"]
+        self.collection.create_index("updated_at", expireAfterSeconds=ttl)
+        self.new_session = new_session
+        self.ttl = ttl
+
+    def get(self, session_id):
+        doc = self.collection.find_one({
+            "_id": session_id,
+            # the TTL monitor only runs once a minute
+            "updated_at": {"$gt": datetime.utcnow() - timedelta(seconds=self.ttl)},
+        })
+        if doc is None:
+            return self.new_session()
+        return doc["session"]
+
+    def save(self, session_id, session):
+        self.collection.update_one(
+            {"_id": session_id},
+            {"$set": {"session": session, "updated_at": datetime.utcnow()}, "$inc": {"version": 1}},
+            upsert=True,
+        )
+
+    def update(self, session_id, apply, retries=SESSION_UPDATE_RETRIES):
+        '''
+        apply(session) on the current session and save it only if no other worker
+        saved it in between (compare-and-set on `version`), otherwise start over
+        from the newer copy. returns the saved session
+        '''
+        from pymongo.errors import DuplicateKeyError
+        for _ in range(retries):
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+            doc = self.collection.find_one({"_id": session_id, "updated_at": {"$gt": cutoff}})
+            session = doc["session"] if doc else self.new_session()
+            apply(session)
+            version = doc.get("version") if doc else None
+            fields = {"session": session, "updated_at": datetime.utcnow(), "version": (version or 0) + 1}
+            if doc is None:
+                # no live session: insert, or replace one that expired but isn't swept yet.
+                # a live one written meanwhile makes the upsert collide on _id
+                try:
+                    self.collection.replace_one({"_id": session_id, "updated_at": {"$lte": cutoff}}, fields, upsert=True)
+                    return session
+                except DuplicateKeyError:
+                    continue
+            # sessions saved before versioning have no field, {"version": None} matches those
+            if self.collection.replace_one({"_id": session_id, "version": version}, fields).matched_count:
+                return session
+        raise SessionConflict(f"Session {session_id!r} changed during {retries} attempts to update it")
+
+    def delete(self, session_id):
+        self.collection.delete_one({"_id": session_id})
+
+
+def create_session_store(new_session, kind=SESSION_STORE):
+    '''
+    `new_session` builds the state for a session id that has none (or has expired)
+    '''
+    if kind == "mongo":
+        return MongoSessionStore(new_session)
+    if kind == "memory":
+        return MemorySessionStore(new_session)
+    raise ValueError(f"Unknown session store {kind!r}, expected 'memory' or 'mongo'")
@@ -0,0 +1,177 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from audio_io import SAMPLE_RATE
+from transcription_service import QueueFull
+
+FRAME_MS = 30
+# a segment ends after this much silence following speech
+VAD_SILENCE_MS = int(os.getenv("VAD_SILENCE_MS", "500"))
+# segments are cut here even without a pause, whisper's window is 30s
+VAD_MAX_SEGMENT_S = float(os.getenv("VAD_MAX_SEGMENT_S", "25"))
+# frame RMS above max(floor, noise estimate * ratio) counts as speech
+VAD_ENERGY_FLOOR = float(os.getenv("VAD_ENERGY_FLOOR", "0.01"))
+VAD_ENERGY_RATIO = float(os.getenv("VAD_ENERGY_RATIO", "3"))
+STREAM_TTL = int(os.getenv("TRANSCRIBE_STREAM_TTL", "600"))
+# segments of a stream that was already accepted wait this long for a whisper slot
+STREAM_SEGMENT_WAIT = float(os.getenv("TRANSCRIBE_STREAM_SEGMENT_WAIT", "30"))
+
+segment_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="segments")
+
+
+def pcm16_to_float(data, sample_rate=SAMPLE_RATE):
+    audio = np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+    if sample_rate != SAMPLE_RATE and len(audio):
+        # linear resampling is plenty for speech going into whisper
+        target = int(len(audio) * SAMPLE_RATE / sample_rate)
+        audio = np.interp(
+            np.linspace(0, len(audio) - 1, target), np.arange(len(audio)), audio
+        ).astype(np.float32)
+    return audio
+
+
+class EnergyVAD:
+    '''
+    splits a stream of 16 kHz samples into speech segments on pauses, using frame
+    energy against a running noise floor
+    '''
+
+    def __init__(self):
+        self.frame = SAMPLE_RATE * FRAME_MS // 1000
+        self.silence_frames = VAD_SILENCE_MS // FRAME_MS
+        self.max_frames = int(VAD_MAX_SEGMENT_S * 1000 / FRAME_MS)
+        self.noise = VAD_ENERGY_FLOOR
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.segment = []
+        self.speech = False
+        self.quiet = 0
+
+    def feed(self, audio):
+        '''
+        returns the segments completed by this audio
+        '''
+        self.pending = np.concatenate([self.pending, audio])
+        done = []
+        while len(self.pending) >= self.frame:
+            frame, self.pending = self.pending[:self.frame], self.pending[self.frame:]
+            rms = float(np.sqrt(np.mean(frame ** 2)))
+            is_speech = rms > max(VAD_ENERGY_FLOOR, self.noise * VAD_ENERGY_RATIO)
+            if not is_speech:
+                self.noise = 0.95 * self.noise + 0.05 * rms
+            if is_speech:
+                self.speech = True
+                self.quiet = 0
+            elif self.speech:
+                self.quiet += 1
+            if self.speech:
+                self.segment.append(frame)
+            if self.speech and (self.quiet >= self.silence_frames or len(self.segment) >= self.max_frames):
+                done.append(self._cut())
+        return done
+
+    def _cut(self):
+        segment = np.concatenate(self.segment)
+        self.segment = []
+        self.speech = False
+        self.quiet = 0
+        return segment
+
+    def flush(self):
+        if self.speech and self.segment:
+            self.segment.append(self.pending)
+            self.pending = np.zeros(0, dtype=np.float32)
+            return [self._cut()]
+        return []
+
+
+class StreamingTranscription:
+    '''
+    one upload in progress: each segment the VAD closes is transcribed right away,
+    so when the last chunk arrives only the final segment is left to do
+    '''
+
+    def __init__(self, service, model_size, sample_rate=SAMPLE_RATE):
+        self.id = uuid.uuid4().hex
+        self.service = service
+        self.model_size = model_size
+        self.sample_rate = sample_rate
+        self.vad = EnergyVAD()
+        # [audio, future] per segment, the audio is kept until its text is in
+        self.segments = []
+        # a 16-bit sample split across two HTTP chunks
+        self.carry = b""
+        self.lock = threading.Lock()
+        self.touched = time.time()
+
+    def _transcribe(self, segment):
+        return self.service.transcribe(segment, self.model_size, wait=STREAM_SEGMENT_WAIT)
+
+    def _submit(self, segments):
+        for segment in segments:
+            self.segments.append([segment, segment_pool.submit(self._transcribe, segment)])
+
+    def _retry_rejected(self):
+        # a segment that found the queue full even after waiting goes around again
+        for entry in self.segments:
+            future = entry[1]
+            if future.done() and isinstance(future.exception(), QueueFull):
+                entry[1] = segment_pool.submit(self._transcribe, entry[0])
+
+    def add_chunk(self, data):
+        with self.lock:
+            self.touched = time.time()
+            data = self.carry + data
+            split = len(data) - len(data) % 2
+            data, self.carry = data[:split], data[split:]
+            self._submit(self.vad.feed(pcm16_to_float(data, self.sample_rate)))
+            return self.partials()
+
+    def partials(self):
+        # texts of the segments finished so far, in order, stopping at the first one
+        # still running. a failed segment stops the list too, finish() raises its error
+        self._retry_rejected()
+        texts = []
+        for _, future in self.segments:
+            if not future.done() or future.exception() is not None:
+                break
+            texts.append(future.result().strip())
+        failed = sum(1 for _, future in self.segments if future.done() and future.exception() is not None)
+        return {"partials": texts, "segments": len(self.segments), "pending": len(self.segments) - len(texts), "failed": failed}
+
+    def finish(self):
+        '''
+        the full text. raises QueueFull when a segment still can't get a slot, the
+        stream is left as it is so finish can be called again
+        '''
+        with self.lock:
+            self._submit(self.vad.flush())
+            self._retry_rejected()
+            texts = [future.result().strip() for _, future in self.segments]
+        return " ".join(t for t in texts if t)
+
+
+class StreamRegistry:
+    def __init__(self, ttl=STREAM_TTL):
+        self.ttl = ttl
+        self.streams = {}
+        self.lock = threading.Lock()
+
+    def create(self, service, model_size, sample_rate=SAMPLE_RATE):
+        stream = StreamingTranscription(service, model_size, sample_rate)
+        with self.lock:
+            now = time.time()
+            for stream_id in [i for i, s in self.streams.items() if now - s.touched > self.ttl]:
+                del self.streams[stream_id]
+            self.streams[stream.id] = stream
+        return stream
+
+    def get(self, stream_id):
+        with self.lock:
+            return self.streams.get(stream_id)
+
+    def pop(self, stream_id):
+        with self.lock:
+            return self.streams.pop(stream_id, None)
@@ -0,0 +1,66 @@
+import json
+import time
+import threading
+from collections import defaultdict, deque
+
+# last N time-to-first-byte samples per (endpoint, mode)
+TTFB_SAMPLES = 500
+
+ttfb_samples = defaultdict(lambda: deque(maxlen=TTFB_SAMPLES))
+ttfb_lock = threading.Lock()
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def wants_stream(request):
+    return (
+        request.args.get("stream", "").lower() in ("1", "true")
+        or "text/event-stream" in request.headers.get("Accept", "")
+    )
+
+
+def record_ttfb(endpoint, mode, seconds):
+    with ttfb_lock:
+        ttfb_samples[(endpoint, mode)].append(seconds)
+
+
+def ttfb_stats():
+    stats = {}
+    with ttfb_lock:
+        for (endpoint, mode), samples in ttfb_samples.items():
+            values = sorted(samples)
+            stats[f"{endpoint} {mode}"] = {
+                "count": len(values),
+                "p50_ms": values[len(values) // 2] * 1000,
+                "p95_ms": values[min(int(len(values) * 0.95), len(values) - 1)] * 1000,
+            }
+    return stats
+
+
+def timed(endpoint, events, started):
+    '''
+    passes SSE chunks through and records when the first one left the server
+    '''
+    first = True
+    for chunk in events:
+        if first:
+            record_ttfb(endpoint, "stream", time.perf_counter() - started)
+            first = False
+        yield chunk
+
+
+def field_deltas(stream, field):
+    '''
+    yields the new text of one string field of a structured output while it is
+    being generated, using the partial JSON the openai stream helper parses for us
+    '''
+    sent = 0
+    for event in stream:
+        if event.type != "content.delta" or not isinstance(event.parsed, dict):
+            continue
+        value = event.parsed.get(field)
+        if isinstance(value, str) and len(value) > sent:
+            yield value[sent:]
+            sent = len(value)
@@ -1,7 +1,5 @@
 from pydantic import BaseModel
-import openai
-from openai import OpenAI
-import os 
+import llm_client
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,11 +14,9 @@ class MathResponse(BaseModel):
     final_answer: str
 
 
-client = OpenAI()
-openai.api_key = os.getenv("OPENAI_API_KEY")
-completion = client.beta.chat.completions.parse(
-    model="gpt-4o-2024-08-06",
-    messages=[
+completion = llm_client.parse(
+    "gpt-4o-2024-08-06",
+    [
         {"role": "system", "content": "You are a helpful math tutor."},
         {"role": "user", "content": "solve 8x + 31 = 2"},
     ],
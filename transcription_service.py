@@ -0,0 +1,133 @@
+import os
+import sys
+import types
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from audio_io import SAMPLE_RATE, decode_audio
+from whisper_worker import init_worker, transcribe_in_worker
+
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "2"))
+# requests waiting or running before new ones are turned away
+WHISPER_MAX_QUEUE = int(os.getenv("WHISPER_MAX_QUEUE", "16"))
+WHISPER_MODELS = [m.strip() for m in os.getenv("WHISPER_MODELS", "tiny,base").split(",") if m.strip()]
+WHISPER_DEFAULT_MODEL = os.getenv("WHISPER_DEFAULT_MODEL", "tiny")
+RTF_SAMPLES = 200
+
+
+class QueueFull(Exception):
+    pass
+
+
+class TranscriptionService:
+    '''
+    a pool of processes that each hold their own whisper models. at most
+    `max_queue` requests are queued or running, beyond that submit raises QueueFull
+    so the endpoint can answer 503 instead of piling up threads
+    '''
+
+    def __init__(self, workers=WHISPER_WORKERS, max_queue=WHISPER_MAX_QUEUE, models=WHISPER_MODELS):
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(threads,),
+        )
+        self.workers = workers
+        self.max_queue = max_queue
+        self.models = models
+        self.slots = threading.BoundedSemaphore(max_queue)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rtf = deque(maxlen=RTF_SAMPLES)
+        self.start_workers()
+
+    def start_workers(self):
+        '''
+        starts every worker process now, without the __main__ module. spawned
+        processes import the parent's __main__ again before anything else, which is
+        flask_server (mongo clients, models, indexes) when it's run directly. the
+        workers only need whisper_worker, so __main__ is an empty module while they
+        start. the pool starts processes on submit and doesn't replace them later
+        '''
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            futures = [self.pool.submit(os.getpid) for _ in range(self.workers)]
+        finally:
+            sys.modules["__main__"] = main
+        for future in futures:
+            future.result()
+
+    def transcribe(self, audio, model_size=WHISPER_DEFAULT_MODEL, wait=None):
+        '''
+        `audio` is the 16 kHz float32 array from audio_io.decode_audio, returns the text.
+        with `wait` (seconds) a full queue is waited on that long before QueueFull
+        '''
+        return self._run(lambda: audio, model_size, wait)
+
+    def transcribe_upload(self, data, model_size=WHISPER_DEFAULT_MODEL, wait=None):
+        '''
+        like transcribe for the bytes of an uploaded file. they are decoded only once
+        there is a slot, so requests turned away with QueueFull never start ffmpeg
+        '''
+        return self._run(lambda: decode_audio(data), model_size, wait)
+
+    def _run(self, load_audio, model_size, wait):
+        if model_size not in self.models:
+            raise ValueError(f"Unknown whisper model {model_size!r}, expected one of {self.models}")
+        if not self.slots.acquire(blocking=wait is not None, timeout=wait):
+            with self.lock:
+                self.rejected += 1
+            raise QueueFull(f"Transcription queue is full ({self.max_queue} requests)")
+        with self.lock:
+            self.in_flight += 1
+        try:
+            audio = load_audio()
+            text, elapsed = self.pool.submit(transcribe_in_worker, audio, model_size).result()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            self.slots.release()
+        duration = len(audio) / SAMPLE_RATE
+        with self.lock:
+            self.completed += 1
+            if duration > 0:
+                self.rtf.append((model_size, elapsed / duration))
+        return text
+
+    def warmup(self, model_size=WHISPER_DEFAULT_MODEL):
+        # one short silent clip per worker so (most likely) every process loads the model
+        # before real traffic, the executor doesn't promise one task per process
+        import numpy as np
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        futures = [self.pool.submit(transcribe_in_worker, silence, model_size) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def metrics(self):
+        with self.lock:
+            rtf = {}
+            for model_size in self.models:
+                values = sorted(r for m, r in self.rtf if m == model_size)
+                if values:
+                    rtf[model_size] = {"p50": values[len(values) // 2], "max": values[-1], "samples": len(values)}
+            return {
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "real_time_factor": rtf,
+            }
+
+
+def create_transcription_service():
+    service = TranscriptionService()
+    service.warmup()
+    return service
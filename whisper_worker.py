@@ -0,0 +1,23 @@
+import time
+
+# what the transcription worker processes run. kept apart from transcription_service
+# (and everything flask_server pulls in) so a worker only ever imports whisper, torch
+# and numpy. torch and whisper are imported in the worker, not when this is imported
+
+# per worker process
+worker_models = {}
+
+
+def init_worker(threads):
+    import torch
+    # split the cores between the workers instead of every process using all of them
+    torch.set_num_threads(threads)
+
+
+def transcribe_in_worker(audio, model_size):
+    if model_size not in worker_models:
+        import whisper
+        worker_models[model_size] = whisper.load_model(model_size)
+    start = time.perf_counter()
+    result = worker_models[model_size].transcribe(audio, fp16=False)
+    return result["text"], time.perf_counter() - start